@@ -0,0 +1,65 @@
+import queue
+import threading
+import time
+
+
+class AnalysisWorker:
+    """Runs occupancy analyses off the MQTT network thread.
+
+    Requests go into a bounded queue. When the queue is full the oldest
+    pending request is dropped so the newest snapshot always wins, and a
+    single worker thread keeps at most one analysis in flight.
+    """
+
+    def __init__(self, analyze, maxsize=1, name="occupancy-analysis"):
+        self.analyze = analyze
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.stats = {
+            "submitted": 0,
+            "coalesced": 0,
+            "completed": 0,
+            "failed": 0,
+            "last_duration": 0.0
+        }
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def submit(self, request_time=None):
+        """Queue an analysis request without blocking the caller"""
+        request = request_time if request_time is not None else time.time()
+        self.stats["submitted"] += 1
+        while True:
+            try:
+                self.queue.put_nowait(request)
+                return
+            except queue.Full:
+                # Latest snapshot wins: drop the stale pending request
+                try:
+                    self.queue.get_nowait()
+                    self.stats["coalesced"] += 1
+                except queue.Empty:
+                    pass
+
+    def stop(self, timeout=None):
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            request = self.queue.get()
+            if request is None:
+                return
+            started = time.perf_counter()
+            try:
+                result = self.analyze()
+                if result:
+                    print(f"Occupancy Analysis Result: {result}")
+                self.stats["completed"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"Occupancy analysis failed: {e}")
+            finally:
+                self.stats["last_duration"] = time.perf_counter() - started
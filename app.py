@@ -1,97 +1,227 @@
 # dashboard.py
-from flask import Flask, render_template, jsonify
+from flask import Blueprint, Flask, Response, abort, render_template, jsonify, request
+import asyncio
+import math
+import os
+import queue
 import threading
-import json
+import codec
 import time
-import paho.mqtt.client as mqtt
-from paho import mqtt as bla
+from mqtt_ingest import IngestCore
+from sensor_registry import registry
+from storage import ReadingStore
+from broadcaster import Broadcaster, sse_event
+from snapshot import Snapshot
+from state_relay import RelayClient, RelayServer
+from static_assets import ASSET_MAX_AGE, AssetBundle, choose_encoding, compress
 
 BROKER = "172.20.10.4"
 PORT = 1883
-TOPICS = [
-    "group3/status",
-    "group2/sensors/ultrasonic",
-    "group2/sensors/pir",
-    "/group1/sensors",
-    "group3/command"
-]
-
-latest_data = {
+TOPICS = registry.subscriptions()
+
+snapshot = Snapshot({
     "group3": {"motion": None, "distance": None, "time": None},
     "group2_ultrasonic": {"distance": None, "time": None},
     "group2_pir": {"motion": None, "time": None},
-    "group1": {"motion":None, "distance": None},
+    "group1": {"motion":None, "distance": None, "time": None},
     "occupancy" : {"occupancy": None, "confidence": None}
-}
-history = []  # store readings as list of dicts
-
-MAX_HISTORY = 100  # keep only last 100 points
-
-# MQTT Callbacks
-def on_connect(client, userdata, flags, rc, properties=None):
-    print(f"Connected with result code {rc}")
-    for topic in TOPICS:
-        client.subscribe(topic)
-
-def on_message(client, userdata, msg):
-    global latest_data
-    timestamp = time.strftime("%H:%M:%S")
-
-    try:
-        payload = json.loads(msg.payload.decode())
-
-        if msg.topic == "group3/status":
-            latest_data["group3"] = {
-                "time": timestamp,
-                "motion": payload.get("motion"),
-                "distance": payload.get("distance")
-            }
-        elif msg.topic == "group2/sensors/ultrasonic":
-            latest_data["group2_ultrasonic"] = {
-                "time": timestamp,
-                "distance": payload.get("distance_cm")
-            }
-        elif msg.topic == "group2/sensors/pir":
-            latest_data["group2_pir"] = {
-                "time": timestamp,
-                "motion": payload.get("motion_detected")
-            }
-        elif msg.topic == "/group1/sensors":
-            latest_data["group1"] = {
-                "motion": payload.get("motion_detected"),
-                "distance": payload.get("distance_cm"),
-                "timestamp": timestamp
-            }
-        elif msg.topic == "group3/command":
-            latest_data["occupancy"] = {
-            "occupancy": payload.get("occupancy_state"),
-            "confidence": payload.get("confidence")
-            }
-
-
-    except json.JSONDecodeError:
-        print("Invalid JSON received")
-
-
-# MQTT Thread Function
-def mqtt_thread():
-    client = mqtt.Client(userdata=None)
-    client.on_connect = on_connect
-    client.on_message = on_message
-    client.connect(BROKER, PORT, 60)
-    client.loop_forever()
+})
+# next to this file, so the ingest process and every worker use the same database
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sensor_data.db")
+store = ReadingStore(DB_PATH, commit_interval=0.2)  # group commit every 200 ms
+
+# Push channel for dashboards: one per-sensor delta (JSON bytes) per MQTT message
+broadcaster = Broadcaster()
+STREAM_KEEPALIVE = 15  # seconds between SSE comments on an idle stream
+# Each /stream client holds a server thread for as long as it is connected, so
+# streams are capped per process below gunicorn's `threads`, leaving the rest
+# for page and API requests; clients past the cap get a 503 and poll /data.
+STREAM_MAX_CLIENTS = int(os.environ.get("DASHBOARD_STREAM_MAX_CLIENTS", 24))
+STREAM_RETRY_AFTER = 30  # seconds, sent with the 503
+stream_slots = threading.BoundedSemaphore(STREAM_MAX_CLIENTS)
+
+# Multi-worker serving: the ingest process shares state with workers over this socket
+RELAY_SOCKET = os.environ.get("DASHBOARD_RELAY_SOCKET", "/tmp/sensor_dashboard_relay.sock")
+
+# Vendored, minified and precompressed at startup, served under content-hash names
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+assets = AssetBundle(STATIC_DIR, ["css/dashboard.css", "vendor/chart.umd.min.js", "js/dashboard.js"])
+COMPRESS_MIN_SIZE = 1024  # bytes; smaller API responses are sent as-is
+COMPRESS_MIMETYPES = {"application/json", "text/html"}
+
+HISTORY_POINTS = 300  # default /history resolution
+HISTORY_MAX_POINTS = 2000  # a smaller step is widened to stay within this many buckets
+
+# MQTT ingest: a coroutine handler on the shared IngestCore (see mqtt_ingest)
+async def handle_message(message):
+    spec = message.spec
+    if spec is None:
+        return
+    # Dashboard shows missing fields as null, so no analyzer defaults here
+    reading = spec.extract_raw(message.payload)
+    if message.replayed:
+        # caught up from a publisher's outbox: file it under when it was measured,
+        # but don't let it overwrite the live view
+        if spec.kind == "sensor":
+            store.add(spec.key, message.ts, reading.get("motion"), reading.get("distance"))
+        return
+    if spec.kind == "sensor":
+        reading["time"] = time.strftime("%H:%M:%S", time.localtime(message.received))
+    snapshot.update(spec.key, reading)
+    broadcaster.publish(codec.dumps({spec.key: reading}))
+    if spec.kind == "sensor":
+        store.add(spec.key, message.received, reading.get("motion"), reading.get("distance"))
+
+def register(core):
+    """Attach the dashboard to an ingest core; it must see every reading, so it blocks"""
+    core.subscribe("dashboard", TOPICS, handle_message, maxsize=1000, policy="block")
+
+def start_ingest(core=None):
+    """Run MQTT ingest and the storage writer in this process (single-process serving)"""
+    core = core or IngestCore(BROKER, PORT)
+    store.start()
+    register(core)
+    return core.start()
+
+def run_ingest(relay_path=RELAY_SOCKET):
+    """Entry point of the dedicated ingest process behind a multi-worker server"""
+    store.start()
+    RelayServer(relay_path, snapshot, broadcaster).start()
+    core = IngestCore(BROKER, PORT)
+    register(core)
+    asyncio.run(core.run())
+
+def apply_relay_update(line, changes):
+    """Worker side of the relay: merge into the local snapshot and push to SSE clients"""
+    snapshot.merge(changes)
+    broadcaster.publish(line)
 
 # Flask App
-app = Flask(__name__)
+dashboard = Blueprint("dashboard", __name__)
 
-@app.route("/")
+def create_app(relay_path=None):
+    """Build the dashboard app; with relay_path, state comes from the ingest process"""
+    app = Flask(__name__, static_folder=None)  # assets are served by the dashboard blueprint
+    assets.build()
+    app.register_blueprint(dashboard)
+    if relay_path:
+        RelayClient(relay_path, apply_relay_update).start()
+    return app
+
+@dashboard.app_context_processor
+def asset_urls():
+    return {"asset_url": assets.url}
+
+@dashboard.after_app_request
+def compress_response(response):
+    """gzip/br API and page responses above COMPRESS_MIN_SIZE (never SSE or 304s)"""
+    if (response.status_code != 200 or response.mimetype not in COMPRESS_MIMETYPES
+            or response.is_streamed or "Content-Encoding" in response.headers):
+        return response
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None or len(body) < COMPRESS_MIN_SIZE:
+        return response
+    response.set_data(compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(etag, weak=True)  # same content, different bytes
+    return response
+
+@dashboard.route("/")
 def index():
-    return render_template("index.html")
+    """The page itself is tiny and revalidated; repeat visits get a 304"""
+    response = Response(render_template("index.html"), mimetype="text/html")
+    response.add_etag()
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
 
-@app.route("/data")
+@dashboard.route("/assets/<name>")
+def asset(name):
+    """Content-hashed asset; the name changes with the content, so cache it forever"""
+    found = assets.get(name)
+    if found is None:
+        abort(404)
+    encoding = choose_encoding(request.accept_encodings, found.variants)
+    response = Response(found.variants[encoding], mimetype=found.mimetype)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = f"public, max-age={ASSET_MAX_AGE}, immutable"
+    return response
+
+@dashboard.route("/data")
 def get_data():
-    return jsonify(latest_data)
+    """Latest readings; answers 304 when the client's ETag is still current"""
+    version, body, etag = snapshot.current
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+@dashboard.route("/stream")
+def stream():
+    """Server-Sent Events: a full snapshot on connect, then per-sensor deltas"""
+    if not stream_slots.acquire(blocking=False):
+        return Response("Too many streams, poll /data instead", status=503, mimetype="text/plain",
+                        headers={"Retry-After": str(STREAM_RETRY_AFTER)})
+
+    def events():
+        # subscribed only once streaming starts: a client gone before that never registers
+        client_queue = broadcaster.subscribe()
+        try:
+            yield sse_event("snapshot", snapshot.current[1])
+            while True:
+                try:
+                    event = client_queue.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield b": keepalive\n\n"
+                    continue
+                if event is None:
+                    return  # too slow, dropped by the broadcaster; the browser reconnects
+                yield sse_event("delta", event)
+        finally:
+            broadcaster.unsubscribe(client_queue)
+
+    response = Response(events(), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.call_on_close(stream_slots.release)  # also runs if the generator never started
+    return response
+
+@dashboard.route("/readings")
+def get_readings():
+    """Raw readings: /readings?sensor=group1&from=<unix ts>&to=<unix ts> (default last hour)"""
+    sensor = request.args.get("sensor")
+    if sensor not in registry.keys("sensor"):
+        return jsonify({"error": "unknown sensor"}), 400
+    end = request.args.get("to", time.time(), type=float)
+    start = request.args.get("from", end - 3600, type=float)
+    return jsonify(store.query(sensor, start, end))
+
+@dashboard.route("/history")
+def get_history():
+    """Downsampled series: /history?sensor=&from=&to=&step=<seconds> (default ~300 points,
+    at most HISTORY_MAX_POINTS; a finer step is widened to fit)"""
+    sensor = request.args.get("sensor")
+    if sensor not in registry.keys("sensor"):
+        return jsonify({"error": "unknown sensor"}), 400
+    end = request.args.get("to", time.time(), type=float)
+    start = request.args.get("from", end - 3600, type=float)
+    step = request.args.get("step", type=float)
+    if not all(math.isfinite(value) for value in (start, end, 0.0 if step is None else step)):
+        return jsonify({"error": "from, to and step must be finite numbers"}), 400
+    if end <= start:
+        return jsonify({"error": "from must be before to"}), 400
+    if step is None:
+        step = (end - start) / HISTORY_POINTS
+    # a range can straddle one extra aligned bucket, hence MAX_POINTS - 1
+    step = max(step, (end - start) / (HISTORY_MAX_POINTS - 1), 1.0)
+    return jsonify(store.history(sensor, start, end, step))
 
 if __name__ == "__main__":
-    threading.Thread(target=mqtt_thread, daemon=True).start()
-    app.run(host="0.0.0.0", port=5003, debug=True)
\ No newline at end of file
+    # Development server; the reloader would fork and start a second MQTT ingest.
+    # Production: gunicorn -c gunicorn.conf.py wsgi:app
+    start_ingest()
+    create_app().run(host="0.0.0.0", port=5003, debug=True, use_reloader=False)
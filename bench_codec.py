@@ -0,0 +1,55 @@
+"""Compare MQTT payload decode/encode throughput across the codec backends.
+
+Payloads are the recorded readings in sensor_data.json plus the per-group
+shapes the subscribers parse. Run: python bench_codec.py [rounds]
+"""
+import json
+import sys
+import time
+
+import codec
+
+GROUP_SHAPES = [
+    {"motion_detected": 1, "distance_cm": 42.7},  # /group1/sensors
+    {"motion_detected": 0},  # group2/sensors/pir
+    {"distance_cm": 118.3},  # group2/sensors/ultrasonic
+    {"occupancy_state": "occupied", "confidence": "high", "active_sensors_count": 3}  # group3/command
+]
+
+
+def load_samples(path="sensor_data.json"):
+    with open(path) as f:
+        readings = json.load(f)
+    return [json.dumps(obj).encode() for obj in readings + GROUP_SHAPES]
+
+
+def bench(fn, items, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in items:
+            fn(item)
+    elapsed = time.perf_counter() - start
+    return rounds * len(items) / elapsed
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    payloads = load_samples()
+    objects = [json.loads(p) for p in payloads]
+    readings = payloads[:-1]  # the command payload is not a sensor reading
+
+    results = [("json.loads(payload.decode()) [old path]",
+                bench(lambda b: json.loads(b.decode()), payloads, rounds))]
+    for name, (loads, dumps) in codec.BACKENDS.items():
+        results.append((f"{name} loads", bench(loads, payloads, rounds)))
+        results.append((f"{name} dumps", bench(dumps, objects, rounds)))
+    results.append((f"decode_reading ({codec.BACKEND})", bench(codec.decode_reading, readings, rounds)))
+
+    print(f"{len(payloads)} payloads x {rounds} rounds, default backend: {codec.BACKEND}")
+    baseline = results[0][1]
+    for label, rate in results:
+        print(f"{label:<42} {rate / 1e3:10.1f} k msg/s  {rate / baseline:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
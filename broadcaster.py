@@ -0,0 +1,53 @@
+import queue
+import threading
+
+
+class Broadcaster:
+    """Fans pre-serialized events out to any number of dashboard clients.
+
+    Each client owns a small bounded queue and its thread sleeps on it, so
+    idle clients cost no CPU. publish() never blocks the MQTT thread: a
+    client that falls behind is disconnected (it gets None) and the browser's
+    EventSource reconnects and receives a fresh snapshot.
+    """
+
+    def __init__(self, client_queue_size=256):
+        self.client_queue_size = client_queue_size
+        self.lock = threading.Lock()
+        self.clients = set()
+        self.stats = {"published": 0, "dropped_clients": 0}
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.client_queue_size)
+        with self.lock:
+            self.clients.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.clients.discard(q)
+
+    def publish(self, event):
+        with self.lock:
+            clients = list(self.clients)
+        self.stats["published"] += 1
+        for q in clients:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                self._drop(q)
+
+    def _drop(self, q):
+        self.unsubscribe(q)
+        self.stats["dropped_clients"] += 1
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass
+        q.put_nowait(None)
+
+
+def sse_event(name, data):
+    """One Server-Sent Events frame; data must already be JSON bytes"""
+    return b"event: " + name.encode() + b"\ndata: " + data + b"\n\n"
@@ -1,5 +1,8 @@
-from gpiozero import DistanceSensor, MotionSensor
-from time import sleep
+from gpiozero import DistanceSensor, MotionSensor, GPIODeviceClosed
+from time import sleep, time
+from bisect import bisect_left, insort
+from collections import deque
+import threading
 
 # Setup for HC-SR04 (Ultrasonic Sensor)
 # TRIG = GPIO23 (pin 16), ECHO = GPIO17 (pin 11)
@@ -9,20 +12,181 @@ ultrasonic = DistanceSensor(echo=17, trigger=23)
 # Motion sensor connected to GPIO24 (pin 18)
 pir = MotionSensor(24)
 
+DISTANCE_WAIT_TIMEOUT = 1.0  # seconds read() waits for a first distance before giving up
 
-def sense_distance_and_motion():
-    print("Starting sensor monitoring...")
-    data = []
-    if pir.motion_detected:
-        data.append(1)
-    else:
-        data.append(0)
 
-    distance = ultrasonic.distance * 100  # convert to cm
-    data.append(distance)
+# ------- Distance filters --------
+# Each filter takes one sample (cm) and returns the filtered value, or None
+# when the sample is rejected.
+
+class RangeFilter:
+    """Reject physically impossible readings (HC-SR04 works from ~2 cm to ~4 m)"""
+
+    def __init__(self, min_cm=2.0, max_cm=400.0):
+        self.min_cm = min_cm
+        self.max_cm = max_cm
+
+    def __call__(self, value):
+        if value != value or not self.min_cm <= value <= self.max_cm:
+            return None
+        return value
+
+
+class MedianFilter:
+    """Windowed median; O(log w) search plus a w-element shift per sample"""
+
+    def __init__(self, window=5):
+        self.size = window
+        self.window = deque()
+        self.ordered = []
+
+    def __call__(self, value):
+        self.window.append(value)
+        insort(self.ordered, value)
+        if len(self.window) > self.size:
+            old = self.window.popleft()
+            del self.ordered[bisect_left(self.ordered, old)]
+        return self.ordered[len(self.ordered) // 2]
+
+
+class EmaFilter:
+    """Exponential moving average, O(1) per sample"""
+
+    def __init__(self, alpha=0.5):
+        self.alpha = alpha
+        self.value = None
+
+    def __call__(self, value):
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+
+class FilterPipeline:
+    def __init__(self, filters):
+        self.filters = list(filters)
+        self.rejected = 0
+
+    def __call__(self, value):
+        for f in self.filters:
+            value = f(value)
+            if value is None:
+                self.rejected += 1
+                return None
+        return value
+
 
+def build_filter_pipeline(min_cm=2.0, max_cm=400.0, median_window=5, ema_alpha=None):
+    """Range check, then optional median and EMA stages (0/None disables a stage)"""
+    filters = [RangeFilter(min_cm, max_cm)]
+    if median_window and median_window > 1:
+        filters.append(MedianFilter(median_window))
+    if ema_alpha:
+        filters.append(EmaFilter(ema_alpha))
+    return FilterPipeline(filters)
+
+
+class SensorSampler:
+    """Non-blocking, edge-triggered view of the PIR and ultrasonic sensors.
+
+    PIR edges arrive through gpiozero's when_motion/when_no_motion callbacks
+    and are latched, so a pulse shorter than the publish interval is still
+    reported by the next read(). A poller thread copies the DistanceSensor's
+    background queue value into the cache every distance_interval seconds
+    (that property blocks while no echo comes back). read() is O(1) and
+    never waits on the pins: only the first call waits, at most
+    DISTANCE_WAIT_TIMEOUT, for a first distance; after that a missing
+    distance is reported as None straight away.
+
+    An optional distance_filter (see build_filter_pipeline) runs on every
+    polled sample; rejected samples leave the cached distance unchanged, so
+    read() also returns the distance's timestamp for callers to spot stale
+    values.
+    """
+
+    def __init__(self, pir, ultrasonic, distance_interval=0.05, distance_filter=None):
+        self.pir = pir
+        self.ultrasonic = ultrasonic
+        self.distance_interval = distance_interval
+        self.distance_filter = distance_filter
+        self.lock = threading.Lock()
+        self.motion = 1 if pir.motion_detected else 0
+        self.motion_ts = time()
+        self.motion_latched = False  # motion seen since the last read()
+        self.motion_events = 0
+        self.distance = None
+        self.distance_ts = None
+        self.distance_ready = threading.Event()
+        self.first_read = True
+        pir.when_motion = self._on_motion
+        pir.when_no_motion = self._on_no_motion
+        self.poller = threading.Thread(target=self._poll_distance, daemon=True)
+        self.poller.start()
+
+    def _poll_distance(self):
+        while not self.ultrasonic.closed:
+            try:
+                distance = self.ultrasonic.distance * 100  # convert to cm
+            except GPIODeviceClosed:
+                return  # cleanup() closed the sensor under us
+            if self.distance_filter is not None:
+                distance = self.distance_filter(distance)
+                if distance is None:
+                    sleep(self.distance_interval)
+                    continue
+            with self.lock:
+                self.distance = distance
+                self.distance_ts = time()
+            self.distance_ready.set()
+            sleep(self.distance_interval)
+
+    def _on_motion(self):
+        with self.lock:
+            self.motion = 1
+            self.motion_latched = True
+            self.motion_events += 1
+            self.motion_ts = time()
+
+    def _on_no_motion(self):
+        with self.lock:
+            self.motion = 0
+            self.motion_ts = time()
+
+    def read(self, timeout=DISTANCE_WAIT_TIMEOUT):
+        """Return [motion, distance_cm, distance_ts]; motion is 1 if any motion happened since
+        the last read. distance_cm and distance_ts are None until a sample passes the filters."""
+        if self.first_read:
+            self.distance_ready.wait(timeout)  # give the first echo a chance, once
+            self.first_read = False
+        with self.lock:
+            motion = 1 if self.motion or self.motion_latched else 0
+            self.motion_latched = False
+            return [motion, self.distance, self.distance_ts]
+
+    def latest(self):
+        """Cached values with their timestamps, without touching the sensors"""
+        with self.lock:
+            return {
+                "motion": self.motion,
+                "motion_ts": self.motion_ts,
+                "motion_events": self.motion_events,
+                "distance": self.distance,
+                "distance_ts": self.distance_ts
+            }
+
+
+print("Starting sensor monitoring...")
+sampler = SensorSampler(pir, ultrasonic)
+
+
+def sense_distance_and_motion():
+    return sampler.read()
 
-    return data
+def configure_filters(**options):
+    """Install a distance filter pipeline on the sampler (options: see build_filter_pipeline)"""
+    sampler.distance_filter = build_filter_pipeline(**options)
 
 def cleanup():
     print("Cleaning up GPIO resources...")
@@ -32,4 +196,4 @@ def cleanup():
 
     # Clean up all GPIO pins used by gpiozero
     from gpiozero import Device
-    Device.pin_factory.cleanup()
\ No newline at end of file
+    Device.pin_factory.cleanup()
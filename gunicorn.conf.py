@@ -0,0 +1,36 @@
+# gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+import subprocess
+import sys
+
+bind = "0.0.0.0:5003"
+workers = multiprocessing.cpu_count()
+# Threads keep long-lived /stream (SSE) connections from pinning whole workers.
+# Each open stream still holds one thread, so app.STREAM_MAX_CLIENTS (24 by
+# default, env DASHBOARD_STREAM_MAX_CLIENTS) caps them per worker below
+# `threads`; further dashboards get a 503 and fall back to polling /data.
+worker_class = "gthread"
+threads = 32
+timeout = 60
+
+ingest_process = None
+
+
+def on_starting(server):
+    """Start the single MQTT ingest process before any worker is forked"""
+    global ingest_process
+    if os.environ.get("DASHBOARD_EXTERNAL_INGEST"):
+        return
+    here = os.path.dirname(os.path.abspath(__file__))
+    ingest_process = subprocess.Popen([sys.executable, os.path.join(here, "ingest.py")], cwd=here)
+    server.log.info("Started MQTT ingest process %s", ingest_process.pid)
+
+
+def on_exit(server):
+    if ingest_process is not None:
+        ingest_process.terminate()
+        try:
+            ingest_process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            ingest_process.kill()
@@ -0,0 +1,38 @@
+# Run the dashboard, the occupancy analyzer and the 7-segment display in one
+# process, sharing a single broker connection through mqtt_ingest.IngestCore.
+# Turn off the parts this machine does not host (the display needs the GPIO
+# header, the analyzer a local Ollama).
+from mqtt_ingest import IngestCore
+
+BROKER = "172.20.10.4"
+PORT = 1883
+
+HOST_DASHBOARD = True
+HOST_ANALYZER = True
+HOST_DISPLAY = False
+
+
+def main():
+    core = IngestCore(BROKER, PORT)
+
+    if HOST_ANALYZER:
+        import subscriber_on_nano
+        subscriber_on_nano.analysis_worker.start()
+        subscriber_on_nano.register(core)
+
+    if HOST_DISPLAY:
+        import subscriber
+        subscriber.start_display()
+        subscriber.register(core)
+
+    if HOST_DASHBOARD:
+        import app
+        app.start_ingest(core)  # starts the core on its own event loop thread
+        app.create_app().run(host="0.0.0.0", port=5003, threaded=True, use_reloader=False)
+    else:
+        import asyncio
+        asyncio.run(core.run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# Dedicated MQTT ingest process for the dashboard (started by gunicorn.conf.py,
+# or run it yourself under systemd and start gunicorn with DASHBOARD_EXTERNAL_INGEST=1)
+from app import run_ingest, RELAY_SOCKET
+
+if __name__ == "__main__":
+    run_ingest(RELAY_SOCKET)
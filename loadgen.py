@@ -0,0 +1,284 @@
+"""Replay recorded sensor streams into the real ingest handlers and measure them.
+
+Virtual sensors cycle through the readings in sensor_data.json, each
+published on one of the registered sensor topics in that group's payload
+shape (see sensor_registry), with "ts" set to the send time. The messages
+go through a real IngestCore into the dashboard and/or occupancy analyzer
+handlers, either via the in-process broker stand-in below or a real broker
+(e.g. a local mosquitto). The report gives end-to-end latency percentiles
+(publish -> handler done) and where messages were dropped.
+
+    python loadgen.py --sensors 1000 --rate 50 --duration 10
+    python loadgen.py --broker localhost:1883 --target analyzer --speedup 100
+"""
+import argparse
+import contextlib
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+import paho.mqtt.client as mqtt
+
+import codec
+from mqtt_ingest import IngestCore
+from sensor_registry import SENSOR_CONFIG, topic_matches
+
+RECORDED_INTERVAL = 3.0  # seconds between readings in sensor_data.json (mqtt_conn.PUBLISH_INTERVAL)
+TICK = 0.01  # generator pacing granularity
+
+BrokerMessage = namedtuple("BrokerMessage", ["topic", "payload", "properties"])
+PublishResult = namedtuple("PublishResult", ["rc", "mid"])
+
+
+# ------- Workload --------
+
+def group_shapes():
+    """(topic, shape) per registered sensor; shape maps a recorded reading to that group's payload"""
+    shapes = []
+    for entry in SENSOR_CONFIG:
+        if entry.get("kind", "sensor") != "sensor":
+            continue
+        keys = {name: aliases[0] for name, (aliases, cast, default) in entry["fields"].items()}
+        shapes.append((entry["topic"], keys))
+    return shapes
+
+
+def load_workload(path="sensor_data.json"):
+    """Per topic, the recorded readings pre-shaped into that group's payload dicts"""
+    with open(path) as f:
+        readings = json.load(f)
+    return [(topic, [{key: reading.get(name) for name, key in keys.items()} for reading in readings])
+            for topic, keys in group_shapes()]
+
+
+def generate(publish, workload, sensors, rate, duration):
+    """Publish `sensors` virtual sensors at `rate` Hz each for `duration` s; returns messages sent"""
+    per_tick = sensors * rate * TICK
+    due = 0.0
+    sent = 0
+    start = next_tick = time.perf_counter()
+    while next_tick - start < duration:
+        due += per_tick
+        while sent < due:
+            sensor = sent % sensors
+            topic, samples = workload[sensor % len(workload)]
+            payload = dict(samples[(sent // sensors + sensor) % len(samples)])
+            payload["ts"] = time.time()
+            publish(topic, codec.dumps(payload))
+            sent += 1
+        next_tick += TICK
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    return sent
+
+
+# ------- In-process broker stand-in --------
+
+class InProcessBroker:
+    """Routes publishes to subscribed clients; a slow client's bounded queue drops new messages"""
+
+    def __init__(self, client_queue_size=10000):
+        self.client_queue_size = client_queue_size
+        self.clients = []
+        self.routes = {}
+        self.stats = {"published": 0, "dropped": 0}
+
+    def client(self):
+        client = BrokerClient(self)
+        self.clients.append(client)
+        return client
+
+    def publish(self, topic, payload):
+        self.stats["published"] += 1
+        targets = self.routes.get(topic)
+        if targets is None:
+            targets = self.routes[topic] = [c for c in self.clients
+                                            if any(topic_matches(f, topic) for f in c.filters)]
+        message = BrokerMessage(topic, payload, None)
+        for client in targets:
+            try:
+                client.inbox.put_nowait(message)
+            except queue.Full:
+                self.stats["dropped"] += 1
+
+
+class BrokerClient:
+    """The slice of paho's Client API that IngestCore uses, backed by InProcessBroker"""
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.filters = []
+        self.inbox = queue.Queue(maxsize=broker.client_queue_size)
+        self.on_connect = None
+        self.on_message = None
+        self.running = False
+
+    def connect_async(self, host, port=1883, keepalive=60):
+        pass
+
+    def loop_start(self):
+        self.running = True
+        threading.Thread(target=self._network_loop, daemon=True).start()
+
+    def _network_loop(self):
+        if self.on_connect is not None:
+            self.on_connect(self, None, {}, 0)
+        while self.running:
+            try:
+                message = self.inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self.on_message(self, None, message)
+
+    def loop_stop(self):
+        self.running = False
+
+    def disconnect(self):
+        pass
+
+    def is_connected(self):
+        return self.running
+
+    def subscribe(self, topic, qos=0):
+        self.filters.append(topic)
+        self.broker.routes.clear()
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        self.broker.publish(topic, payload)
+        return PublishResult(mqtt.MQTT_ERR_SUCCESS, 0)
+
+
+# ------- Measurement --------
+
+def timed(handler, latencies):
+    """Wrap a consumer's handler to record publish -> handled latency of generated readings"""
+    async def wrapper(message):
+        await handler(message)
+        if message.spec is not None and message.spec.kind == "sensor":
+            latencies.append(time.time() - message.ts)
+    return wrapper
+
+
+def percentiles(values, points=(0.5, 0.9, 0.99, 0.999)):
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    result = {f"p{q * 100:g}": ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in points}
+    result["max"] = ordered[-1]
+    return result
+
+
+def register_targets(core, targets, workdir, with_ai):
+    started = []
+    if "dashboard" in targets:
+        import app
+        app.store.path = os.path.join(workdir, "loadgen.db")
+        app.store.start()
+        app.register(core)
+        started.append(("storage", app.store.stats, app.store.close))
+    if "analyzer" in targets:
+        import subscriber_on_nano
+        if not with_ai:
+            subscriber_on_nano.decision_engine.escalate = None  # measure ingest, not the LLM
+        subscriber_on_nano.analysis_worker.start()
+        subscriber_on_nano.register(core)
+        started.append(("analysis", subscriber_on_nano.analysis_worker.stats,
+                        subscriber_on_nano.analysis_worker.stop))
+    return started
+
+
+def wait_idle(core, timeout):
+    """Wait until the consumers stop making progress (or timeout)"""
+    deadline = time.monotonic() + timeout
+    last = None
+    while time.monotonic() < deadline:
+        progress = [(c.stats["handled"], c.stats["failed"], c.stats["dropped"]) for c in core.consumers]
+        if progress == last and all(c.queue.empty() for c in core.consumers):
+            return
+        last = progress
+        time.sleep(0.2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sensors", type=int, default=1000, help="virtual sensors (default 1000)")
+    parser.add_argument("--rate", type=float, help="readings per second per sensor (default 50)")
+    parser.add_argument("--speedup", type=float,
+                        help=f"replay speed relative to the recording ({RECORDED_INTERVAL:g} s per reading)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load (default 10)")
+    parser.add_argument("--target", choices=["dashboard", "analyzer", "both"], default="both")
+    parser.add_argument("--broker", help="host[:port] of a real broker; default is the in-process stand-in")
+    parser.add_argument("--publishers", type=int, default=4, help="publisher connections to a real broker")
+    parser.add_argument("--queue-size", type=int, default=10000, help="stand-in broker queue per client")
+    parser.add_argument("--with-ai", action="store_true", help="let the analyzer escalate to Ollama")
+    parser.add_argument("--data", default="sensor_data.json")
+    args = parser.parse_args()
+
+    rate = args.rate if args.rate else (args.speedup / RECORDED_INTERVAL if args.speedup else 50.0)
+    targets = ("dashboard", "analyzer") if args.target == "both" else (args.target,)
+    workload = load_workload(args.data)
+
+    publishers = []
+    if args.broker:
+        host, _, port = args.broker.partition(":")
+        port = int(port or 1883)
+        core = IngestCore(host, port)
+        for _ in range(args.publishers):
+            client = mqtt.Client()
+            client.connect(host, port, 60)
+            client.loop_start()
+            publishers.append(client)
+        broker = None
+        turn = [0]
+
+        def publish(topic, payload):
+            turn[0] += 1
+            publishers[turn[0] % len(publishers)].publish(topic, payload)
+    else:
+        broker = InProcessBroker(args.queue_size)
+        core = IngestCore("in-process", client=broker.client())
+        publish = broker.publish
+
+    latencies = {}
+    with tempfile.TemporaryDirectory() as workdir, open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull):  # the handlers print every reading
+            started = register_targets(core, targets, workdir, args.with_ai)
+            for consumer in core.consumers:
+                latencies[consumer.name] = []
+                consumer.handler = timed(consumer.handler, latencies[consumer.name])
+            core.start()
+            time.sleep(0.5)  # let the core connect and subscribe
+            start = time.perf_counter()
+            sent = generate(publish, workload, args.sensors, rate, args.duration)
+            elapsed = time.perf_counter() - start
+            wait_idle(core, timeout=30)
+            core.stop()
+            for client in publishers:
+                client.loop_stop()
+                client.disconnect()
+            for name, stats, stop in started:
+                stop()
+
+    print(f"{args.sensors} sensors x {rate:g} Hz for {args.duration:g} s via "
+          f"{args.broker or 'in-process broker'} -> {', '.join(targets)}")
+    print(f"sent {sent} in {elapsed:.1f} s ({sent / elapsed:.0f}/s, target {args.sensors * rate:.0f}/s)")
+    if broker is not None:
+        print(f"broker dropped {broker.stats['dropped']} (client queue full)")
+    print(f"ingest: {core.stats}")
+    for consumer in core.consumers:
+        measured = latencies[consumer.name]
+        summary = "  ".join(f"{k} {v * 1000:.2f}" for k, v in percentiles(measured).items())
+        print(f"{consumer.name}: handled {len(measured)} of {sent} readings, lost {sent - len(measured)} "
+              f"(queue policy drops {consumer.stats['dropped']}, handler errors {consumer.stats['failed']})")
+        print(f"  latency ms: {summary}")
+    for name, stats, stop in started:
+        print(f"{name}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,44 @@
-from time import sleep
+from time import sleep, time, monotonic
 import paho.mqtt.client as mqtt
 from paho import mqtt as bla
-from distance_sensor import sense_distance_and_motion
-import json
+from distance_sensor import sense_distance_and_motion, configure_filters
+from publish_policy import SampleWindow, DeadbandFilter
+from offline_queue import OfflineQueue
+import codec
 import os
+import threading
 
 # BROKER = "2823ed90a94448278aa9e1a1a2624e41.s1.eu.hivemq.cloud"
 BROKER = "172.20.10.4"
 PORT = 1883
 TOPIC = "group3/status"
 LOG_FILE = "sensor_data.json"
+PAYLOAD_FORMAT = "json"  # "json" or "binary" (13-byte struct on TOPIC + "/bin")
+PUBLISH_INTERVAL = 3  # seconds between samples when windowing is off
+DISTANCE_MAX_AGE = 2.0  # seconds; an older cached distance is published as missing (null)
+
+# Ultrasonic filtering before anything is published (0/None disables a stage)
+FILTER_MIN_CM = 2.0
+FILTER_MAX_CM = 400.0
+FILTER_MEDIAN_WINDOW = 5  # samples, removes single-sample spikes
+FILTER_EMA_ALPHA = None  # e.g. 0.3 for extra smoothing, adds lag
+
+# Windowed mode: sample at SAMPLE_RATE_HZ, publish one summary per WINDOW_SIZE samples
+WINDOW_SIZE = 0  # 0 = off, one message per sample
+SAMPLE_RATE_HZ = 20
+WINDOW_RAW_SAMPLES = False  # include the raw [motion, distance] samples in each summary
+WINDOW_FLUSH_ON_MOTION = True  # publish immediately when motion starts or stops
+
+# Report-by-exception: skip readings that did not change beyond the deadband
+DEADBAND_ENABLED = False
+DEADBAND_CM = 5.0
+HEARTBEAT_INTERVAL = 8  # seconds; the analyzer drops sensors silent for more than 10 s
+
+# Offline queue: readings that cannot be published are kept on disk and replayed later
+OUTBOX_PATH = "outbox.log"
+OUTBOX_MAX_BYTES = 16 * 1024 * 1024  # oldest readings are dropped beyond this
+REPLAY_RATE = 50  # messages per second while catching up after a reconnect
+REPLAY_BATCH = 25
 
 def on_connect(client, userdata, flags, rc, properties=None):
     print(f"Connected with result code {rc}")
@@ -20,9 +49,110 @@ def on_message(client, userdata, msg):
 
 def on_publish(client, userdata, mid):
     print(f"Message published with ID {mid}")
+    replay_acks.acknowledge(mid)
+
+
+class PubackTracker:
+    """Collects on_publish mids while a replay batch is in flight.
+
+    For QoS 1 paho calls on_publish on PUBACK, so a batch is delivered once
+    all of its mids came back. Mids are only recorded between expect() and
+    done(), so live QoS 0 publishes don't accumulate here; no lock is held
+    while publishing, as paho calls on_publish under its own locks.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.expecting = False
+        self.acked = set()
+
+    def expect(self):
+        with self.condition:
+            self.expecting = True
+            self.acked.clear()
+
+    def acknowledge(self, mid):
+        with self.condition:
+            if self.expecting:
+                self.acked.add(mid)
+                self.condition.notify_all()
+
+    def wait(self, mids):
+        with self.condition:
+            self.condition.wait_for(lambda: self.acked.issuperset(mids))
+
+    def done(self):
+        with self.condition:
+            self.expecting = False
+            self.acked.clear()
+
+
+replay_acks = PubackTracker()
 
 
+def sample():
+    """(motion, distance, ts); distance is None when no fresh echo passed the filters"""
+    motion, distance, distance_ts = sense_distance_and_motion()
+    now = time()
+    if distance_ts is None or now - distance_ts > DISTANCE_MAX_AGE:
+        distance = None
+    return motion, distance, now
+
+
+def readings():
+    """Yield the readings to publish: every sample, or one summary per window"""
+    if WINDOW_SIZE <= 0:
+        while True:
+            motion, distance, ts = sample()
+            yield {"motion": motion, "distance": distance, "ts": ts}
+            sleep(PUBLISH_INTERVAL)
+
+    window = SampleWindow(WINDOW_SIZE, WINDOW_RAW_SAMPLES, WINDOW_FLUSH_ON_MOTION)
+    period = 1.0 / SAMPLE_RATE_HZ
+    next_sample = monotonic()
+    while True:
+        summary = window.add(*sample())
+        if summary is not None:
+            yield summary
+        # Deadline-based pacing so sampling time does not accumulate drift
+        next_sample += period
+        sleep(max(0.0, next_sample - monotonic()))
+
+def encode_reading(reading, seq):
+    """Return (topic, payload bytes) in the configured PAYLOAD_FORMAT"""
+    if PAYLOAD_FORMAT == "binary":
+        # Window statistics do not fit the fixed struct; motion/distance/ts do (None -> NaN)
+        message = codec.encode_binary(reading["motion"], reading["distance"], reading["ts"], seq)
+        return TOPIC + codec.BINARY_SUFFIX, message
+    return TOPIC, codec.dumps(reading)
+
+def replay_outbox(client, outbox, acks=replay_acks):
+    """Drain the outbox in rate-limited batches whenever the broker is reachable.
+
+    A batch is published with QoS 1 and committed only once every message in
+    it was acknowledged. If the link drops first, paho keeps the unacknowledged
+    messages and re-sends them after reconnecting, so the batch is waited on
+    rather than published again.
+    """
+    interval = REPLAY_BATCH / REPLAY_RATE
+    while True:
+        if len(outbox) and client.is_connected():
+            seq, records = outbox.peek(REPLAY_BATCH)
+            acks.expect()
+            try:
+                mids = [client.publish(topic, codec.mark_replayed(topic, payload), qos=1).mid
+                        for ts, topic, payload in records]
+                acks.wait(mids)
+            finally:
+                acks.done()
+            sent = outbox.commit(seq + len(records))
+            print(f"Replayed {sent} queued readings, {len(outbox)} left")
+        sleep(interval)
+
 def main():
+    configure_filters(min_cm=FILTER_MIN_CM, max_cm=FILTER_MAX_CM,
+                      median_window=FILTER_MEDIAN_WINDOW, ema_alpha=FILTER_EMA_ALPHA)
+
     client = mqtt.Client(userdata=None)
 
     # client.tls_set(tls_version=bla.client.ssl.PROTOCOL_TLS)
@@ -32,35 +162,39 @@ def main():
     client.on_message = on_message
     client.on_publish = on_publish
 
-    client.connect(BROKER, PORT, 60)
+    # Keep retrying in the background; readings are queued until the broker is back
+    client.reconnect_delay_set(min_delay=1, max_delay=30)
+    client.connect_async(BROKER, PORT, 60)
     client.loop_start()
 
-    try:
-        while True:
-            data = sense_distance_and_motion()
-            motion = data[0]
-            distance = data[1]
+    outbox = OfflineQueue(OUTBOX_PATH, max_bytes=OUTBOX_MAX_BYTES)
+    if len(outbox):
+        print(f"{len(outbox)} readings queued from a previous run")
+    threading.Thread(target=replay_outbox, args=(client, outbox), daemon=True).start()
 
-            payload = {
-                "motion": motion,
-                "distance": distance
-            }
-
-            json_payload = json.dumps(payload)
+    deadband = DeadbandFilter(DEADBAND_CM, HEARTBEAT_INTERVAL) if DEADBAND_ENABLED else None
+    seq = 0
+    try:
+        for reading in readings():
+            if deadband is not None and not deadband.should_publish(reading, monotonic()):
+                continue
+            topic, message = encode_reading(reading, seq)
+            seq += 1
 
             # Send over MQTT
-            result = client.publish(TOPIC, json_payload)
-            if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                print(f"Success! Sent data: {json_payload}")
+            if client.is_connected() and client.publish(topic, message).rc == mqtt.MQTT_ERR_SUCCESS:
+                print(f"Success! Sent data: motion={reading['motion']}, distance={reading['distance']} ({len(message)} bytes)")
+                if deadband is not None:
+                    print(f"Deadband stats: {deadband.stats}")
             else:
-                print("Failed to publish message")
-
-            sleep(3)
+                outbox.append(topic, message, reading["ts"])
+                print(f"Broker unavailable, queued reading ({len(outbox)} waiting)")
     except KeyboardInterrupt:
         print("Stopped by user")
     finally:
         client.loop_stop()
         client.disconnect()
+        outbox.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,199 @@
+"""Shared asyncio MQTT ingestion core.
+
+One IngestCore owns the process's single broker connection. paho's network
+loop runs in its own thread (loop_start); every message is decoded once
+into a Message and handed to the asyncio loop, which fans it out to each
+consumer whose topic filters match. A consumer has its own bounded
+asyncio.Queue and a task that awaits its coroutine handler, so the
+dashboard, the occupancy analyzer and the display can share one process
+without a slow one delaying the others.
+
+Backpressure is chosen per consumer:
+  "block"  - delivery waits for queue space. This stalls paho's reader
+             thread and, through TCP flow control, the broker; nothing is lost.
+  "latest" - the oldest queued message is dropped instead (counted in
+             stats["dropped"]); for consumers that only care about the newest state.
+"""
+import asyncio
+import concurrent.futures
+import threading
+import time
+from collections import namedtuple
+
+import paho.mqtt.client as mqtt
+
+import codec
+from sensor_registry import registry, topic_matches
+
+# topic: sensor topic without the "/bin" suffix; spec: its SensorSpec (None if
+# unregistered); payload: decoded JSON, or a binary reading under the spec's
+# payload keys (SensorSpec.from_binary); received: unix time;
+# ts: when the reading was taken (payload "ts", else received); replayed: sent
+# late from a publisher's offline queue, so history rather than live state
+Message = namedtuple("Message", ["topic", "spec", "payload", "received", "ts", "replayed"])
+
+POLICIES = ("block", "latest")
+BACKPRESSURE_POLL = 0.5  # seconds; how often a blocked paho thread checks for shutdown
+
+
+class Consumer:
+    def __init__(self, name, topics, handler, maxsize=1000, policy="block"):
+        if not asyncio.iscoroutinefunction(handler):
+            raise TypeError(f"{name}: handler must be a coroutine function")
+        if policy not in POLICIES:
+            raise ValueError(f"{name}: unknown policy {policy!r}")
+        self.name = name
+        self.topics = list(topics)
+        self.handler = handler
+        self.maxsize = maxsize
+        self.policy = policy
+        self.queue = None  # created on the core's event loop
+        self.task = None
+        self.stats = {"delivered": 0, "handled": 0, "failed": 0, "dropped": 0}
+
+    def matches(self, topic):
+        return any(topic_matches(pattern, topic) for pattern in self.topics)
+
+    async def put(self, message):
+        self.stats["delivered"] += 1
+        if self.policy == "block":
+            await self.queue.put(message)
+            return
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.stats["dropped"] += 1
+        self.queue.put_nowait(message)
+
+    async def run(self):
+        while True:
+            message = await self.queue.get()
+            try:
+                await self.handler(message)
+                self.stats["handled"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"[{self.name}] Error handling {message.topic}: {e}")
+
+
+class IngestCore:
+    def __init__(self, broker, port=1883, keepalive=60, client=None):
+        self.broker = broker
+        self.port = port
+        self.keepalive = keepalive
+        self.client = client or mqtt.Client()
+        self.client.on_connect = self._on_connect
+        self.client.on_message = self._on_message
+        self.consumers = []
+        self.routes = {}  # raw topic -> (consumers, any blocking), memoized
+        self.loop = None
+        self.stopped = None
+        self.stopping = False  # set on shutdown; paho's thread stops delivering
+        self.ready = threading.Event()
+        self.stats = {"received": 0, "invalid": 0, "unrouted": 0}
+
+    def subscribe(self, name, topics, handler, maxsize=1000, policy="block"):
+        """Register a coroutine handler(message) for MQTT topic filters; call before run()"""
+        consumer = Consumer(name, topics, handler, maxsize, policy)
+        self.consumers.append(consumer)
+        self.routes.clear()
+        return consumer
+
+    def topics(self):
+        return sorted({topic for consumer in self.consumers for topic in consumer.topics})
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        """Publish on the shared connection; safe from any thread"""
+        return self.client.publish(topic, payload, qos=qos, retain=retain)
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        for consumer in self.consumers:
+            consumer.queue = asyncio.Queue(maxsize=consumer.maxsize)
+            consumer.task = asyncio.create_task(consumer.run())
+        self.client.connect_async(self.broker, self.port, self.keepalive)
+        self.client.loop_start()
+        self.ready.set()
+        try:
+            await self.stopped.wait()
+        finally:
+            # paho's thread may be blocked on backpressure; the flag releases it,
+            # and joining it off the event loop lets pending deliveries finish
+            self.stopping = True
+            self.client.disconnect()
+            await self.loop.run_in_executor(None, self.client.loop_stop)
+            for consumer in self.consumers:
+                consumer.task.cancel()
+
+    def start(self):
+        """Run the core on its own event loop thread, for hosts with a blocking main loop"""
+        threading.Thread(target=asyncio.run, args=(self.run(),), daemon=True).start()
+        self.ready.wait()
+        return self
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.stopped.set)
+
+    # paho callbacks, called on paho's network thread
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        print(f"[MQTT] Connected with result code {rc}")
+        for topic in self.topics():
+            client.subscribe(topic)
+
+    def _route(self, topic):
+        route = self.routes.get(topic)
+        if route is None:
+            consumers = [c for c in self.consumers if c.matches(topic)]
+            route = self.routes[topic] = (consumers, any(c.policy == "block" for c in consumers))
+        return route
+
+    def _on_message(self, client, userdata, msg):
+        if self.stopping:
+            return
+        self.stats["received"] += 1
+        consumers, blocking = self._route(msg.topic)
+        if not consumers:
+            self.stats["unrouted"] += 1
+            return
+        try:
+            message = self._decode(msg)
+        except (*codec.DecodeError, ValueError, TypeError) as e:
+            self.stats["invalid"] += 1
+            print(f"[MQTT] Invalid payload on {msg.topic}: {e}")
+            return
+        future = asyncio.run_coroutine_threadsafe(self._deliver(message, consumers), self.loop)
+        if not blocking:
+            return
+        # backpressure: don't read the next message until there is room
+        while not self.stopping:
+            try:
+                future.result(timeout=BACKPRESSURE_POLL)
+                return
+            except concurrent.futures.TimeoutError:
+                pass
+        future.cancel()  # shutting down; drop it rather than hold up loop_stop()
+
+    @staticmethod
+    def _decode(msg):
+        topic = msg.topic
+        if topic.endswith(codec.BINARY_SUFFIX):
+            topic = topic[:-len(codec.BINARY_SUFFIX)]
+        spec = registry.lookup(topic)
+        # sensor readings decode straight into the typed struct when msgspec is present
+        # and the struct has all of the sensor's payload keys
+        topic, payload = codec.decode_message(msg, reading=spec is not None and spec.typed)
+        if spec is not None and codec.is_binary(msg):
+            payload = spec.from_binary(payload)  # binary fields -> this group's payload keys
+        received = time.time()
+        get = getattr(payload, "get", None)
+        if get is None:  # not a JSON object, e.g. a bare number
+            return Message(topic, spec, payload, received, received, False)
+        ts = get("ts")
+        return Message(topic, spec, payload, received,
+                       ts if isinstance(ts, (int, float)) else received, bool(get("replayed")))
+
+    async def _deliver(self, message, consumers):
+        for consumer in consumers:
+            await consumer.put(message)
@@ -0,0 +1,62 @@
+from collections import namedtuple
+
+Decision = namedtuple("Decision", ["state", "confidence", "source", "detail"])
+
+
+class RulesClassifier:
+    """Deterministic occupancy classifier over the sensor voting result.
+
+    classify() receives the "occupancy_analysis" section built by the
+    subscriber and returns (state, confidence) with confidence in [0, 1].
+    """
+
+    name = "rules"
+
+    def classify(self, analysis):
+        active = len(analysis["active_sensors"])
+        votes = len(analysis["occupancy_sensors"])
+        predicted = analysis["predicted_state"]
+
+        if predicted == "vacant":
+            # Timeout already elapsed; sensors still reporting proximity weaken it
+            if votes == 0:
+                return "vacant", 1.0
+            return "vacant", 1.0 - votes / max(active, 1)
+
+        if predicted == "occupied":
+            if votes >= analysis["voting_threshold"] and votes == active:
+                return "occupied", 1.0
+            return "occupied", votes / max(active, 1)
+
+        return "unknown", 0.0
+
+
+class DecisionEngine:
+    """Settles clear-cut cases with a fast classifier and escalates the rest.
+
+    escalate(context) is only called when the classifier confidence is below
+    threshold; it must return (state, detail) or None on failure.
+    """
+
+    def __init__(self, classifier, escalate=None, threshold=0.9):
+        self.classifier = classifier
+        self.escalate = escalate
+        self.threshold = threshold
+        self.stats = {classifier.name: 0, "escalated": 0, "escalation_failed": 0}
+
+    def decide(self, context):
+        analysis = context["occupancy_analysis"]
+        state, confidence = self.classifier.classify(analysis)
+
+        if confidence >= self.threshold or self.escalate is None:
+            self.stats[self.classifier.name] += 1
+            detail = f"{self.classifier.name}: {analysis['voting_result']} -> {state.upper()}"
+            return Decision(state, confidence, self.classifier.name, detail)
+
+        result = self.escalate(context)
+        if result is None:
+            self.stats["escalation_failed"] += 1
+            return None
+        self.stats["escalated"] += 1
+        ai_state, detail = result
+        return Decision(ai_state, confidence, "escalated", detail)
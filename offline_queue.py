@@ -0,0 +1,170 @@
+"""Disk-backed outbound queue for readings that could not be published.
+
+Records are appended to a log file, each framed as
+    <original ts: float64><topic length: uint16><payload length: uint32><topic><payload>
+and consumed from a head offset kept in <path>.head. Consumed records stay
+in the log until the consumed prefix passes compact_bytes; compact() then
+rewrites the file with only the unread tail. The log is bounded by
+max_bytes: appending past it drops the oldest unread records first.
+
+Consumers peek() a batch, deliver it without holding the queue's lock, and
+commit() it once delivery is confirmed (mqtt_conn waits for the broker's
+PUBACKs). Records are numbered in order, so a commit only removes records
+that are still queued even if appends dropped some in the meantime.
+
+Crash safety: a torn record at the end of the log (power cut mid-write) is
+truncated on open. The head file also records the log's inode, so a head
+offset saved before a compaction is never applied to the compacted file.
+Delivery is at-least-once: a crash between delivering and committing a
+batch replays it again.
+"""
+import os
+import shutil
+import struct
+import threading
+import time
+from collections import deque
+
+RECORD_HEADER = struct.Struct("<dHI")
+
+
+class OfflineQueue:
+    def __init__(self, path, max_bytes=16 * 1024 * 1024, compact_bytes=1024 * 1024, sync_interval=5.0):
+        self.path = path
+        self.head_path = path + ".head"
+        self.max_bytes = max_bytes
+        self.compact_bytes = compact_bytes
+        self.sync_interval = sync_interval
+        self.lock = threading.Lock()
+        self.sizes = deque()  # byte sizes of the unread records, oldest first
+        self.head = 0  # file offset of the oldest unread record
+        self.first = 0  # sequence number of the oldest unread record (counted from open)
+        self.end = 0
+        self.last_sync = time.monotonic()
+        self.stats = {"queued": 0, "replayed": 0, "dropped": 0, "compactions": 0}
+        self._open()
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def _open(self):
+        self.file = open(self.path, "a+b")  # writes always go to the end
+        self.head = self._load_head()
+        size = self.file.seek(0, os.SEEK_END)
+        if self.head > size:
+            self.head = 0
+        offset = self.head
+        self.file.seek(offset)
+        while True:
+            header = self.file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+            ts, topic_len, payload_len = RECORD_HEADER.unpack(header)
+            record_size = RECORD_HEADER.size + topic_len + payload_len
+            if offset + record_size > size:
+                break
+            self.sizes.append(record_size)
+            offset += record_size
+            self.file.seek(offset)
+        if offset < size:
+            print(f"Offline queue: truncating {size - offset} bytes of a torn record")
+            self.file.truncate(offset)
+        self.end = offset
+
+    def _load_head(self):
+        try:
+            with open(self.head_path) as f:
+                offset, inode = (int(field) for field in f.read().split())
+        except (OSError, ValueError):
+            return 0
+        return offset if inode == os.fstat(self.file.fileno()).st_ino else 0
+
+    def _save_head(self):
+        tmp = self.head_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(f"{self.head} {os.fstat(self.file.fileno()).st_ino}\n")
+        os.replace(tmp, self.head_path)
+
+    def append(self, topic, payload, ts):
+        """Queue one message with the time it was originally produced"""
+        topic = topic.encode()
+        record = RECORD_HEADER.pack(ts, len(topic), len(payload)) + topic + payload
+        with self.lock:
+            dropped = 0
+            while self.sizes and self.end - self.head + len(record) > self.max_bytes:
+                self.head += self.sizes.popleft()
+                dropped += 1
+            if dropped:
+                self.first += dropped
+                self.stats["dropped"] += dropped
+                self._save_head()  # or a crash brings the dropped records back
+            self.file.write(record)
+            self.file.flush()
+            self.sizes.append(len(record))
+            self.end += len(record)
+            self.stats["queued"] += 1
+            now = time.monotonic()
+            if now - self.last_sync >= self.sync_interval:
+                os.fsync(self.file.fileno())
+                self.last_sync = now
+            self._maybe_compact()
+
+    def _peek(self, limit):
+        count = min(limit, len(self.sizes))
+        self.file.seek(self.head)
+        data = self.file.read(sum(self.sizes[i] for i in range(count)))
+        records, offset = [], 0
+        for _ in range(count):
+            ts, topic_len, payload_len = RECORD_HEADER.unpack_from(data, offset)
+            offset += RECORD_HEADER.size
+            topic = data[offset:offset + topic_len].decode()
+            offset += topic_len
+            records.append((ts, topic, data[offset:offset + payload_len]))
+            offset += payload_len
+        return records
+
+    def peek(self, limit):
+        """(seq, records): up to `limit` oldest (ts, topic, payload) records, left queued;
+        seq numbers the first of them for commit()"""
+        with self.lock:
+            return self.first, self._peek(limit)
+
+    def commit(self, end):
+        """Remove the records numbered below `end` that are still queued; returns how many"""
+        with self.lock:
+            count = min(end - self.first, len(self.sizes))
+            if count <= 0:
+                return 0
+            for _ in range(count):
+                self.head += self.sizes.popleft()
+            self.first += count
+            self.stats["replayed"] += count
+            self._save_head()
+            self._maybe_compact()
+            return count
+
+    def _maybe_compact(self):
+        if self.head >= self.compact_bytes or (self.head and not self.sizes):
+            self._compact()
+
+    def _compact(self):
+        tmp = self.path + ".tmp"
+        self.file.seek(self.head)
+        with open(tmp, "wb") as out:
+            shutil.copyfileobj(self.file, out)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, self.path)
+        self.file.close()
+        self.file = open(self.path, "a+b")
+        self.end -= self.head
+        self.head = 0
+        self._save_head()
+        self.stats["compactions"] += 1
+
+    def close(self):
+        with self.lock:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self._save_head()
+            self.file.close()
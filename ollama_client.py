@@ -0,0 +1,83 @@
+import json
+import requests
+from requests.adapters import HTTPAdapter
+
+STOP_WORDS = ("OCCUPIED", "VACANT", "UNKNOWN")
+
+
+def compact_json(data, precision=1):
+    """Serialize a prompt payload with no whitespace and rounded floats"""
+    return json.dumps(_compact(data, precision), separators=(",", ":"))
+
+
+def _compact(value, precision):
+    if isinstance(value, float):
+        if value != value or value in (float("inf"), float("-inf")):
+            return str(value)
+        return round(value, precision)
+    if isinstance(value, dict):
+        return {k: _compact(v, precision) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_compact(v, precision) for v in value]
+    return value
+
+
+class OllamaClient:
+    """Chat client for a local Ollama server.
+
+    Keeps one pooled keep-alive session, streams the reply and cuts it at the
+    first of stop_words, and asks Ollama to keep the model loaded between calls.
+    The rest of the stream is still read to its end (num_predict keeps it
+    short): closing a response mid-body makes urllib3 drop the connection
+    instead of returning it to the pool.
+    """
+
+    def __init__(self, url, model, timeout=30, num_predict=8, keep_alive="30m",
+                 stop_words=STOP_WORDS, pool_maxsize=2):
+        self.url = url
+        self.model = model
+        self.timeout = timeout
+        self.num_predict = num_predict
+        self.keep_alive = keep_alive
+        self.stop_words = stop_words
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def chat(self, messages):
+        """Return the assistant reply (possibly cut at a stop word) or None on failure"""
+        body = {
+            "model": self.model,
+            "messages": messages,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+            "options": {"num_predict": self.num_predict}
+        }
+        try:
+            with self.session.post(self.url, json=body, timeout=self.timeout, stream=True) as resp:
+                resp.raise_for_status()
+                return self._read_stream(resp)
+        except Exception as e:
+            print(f"Ollama call failed: {e}")
+            return None
+
+    def _read_stream(self, resp):
+        parts = []
+        answer = None
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if "error" in chunk:
+                raise RuntimeError(chunk["error"])
+            if answer is None:
+                parts.append(chunk.get("message", {}).get("content", ""))
+                text = "".join(parts)
+                upper = text.upper()
+                if any(word in upper for word in self.stop_words):
+                    answer = text  # keep reading to the end so the connection goes back to the pool
+        return answer if answer is not None else "".join(parts)
+
+    def close(self):
+        self.session.close()
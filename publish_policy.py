@@ -0,0 +1,115 @@
+"""Policies deciding what the sensor publisher sends and when."""
+
+
+class SampleWindow:
+    """Collects high-rate samples and emits one summary per window.
+
+    add() returns None while the window fills, and a summary dict once it
+    holds `size` samples or, with flush_on_motion_edge, as soon as motion
+    flips, so motion onset is reported within one sample period. The
+    summary keeps the usual "motion"/"distance" keys (any motion, mean
+    distance) so existing subscribers read it unchanged. Samples without a
+    distance (None) count for motion only; a window with none has no
+    distance statistics.
+    """
+
+    def __init__(self, size, include_samples=False, flush_on_motion_edge=True):
+        self.size = size
+        self.include_samples = include_samples
+        self.flush_on_motion_edge = flush_on_motion_edge
+        self.last_motion = None
+        self._reset()
+
+    def _reset(self):
+        self.samples = []
+        self.count = 0
+        self.motion_count = 0
+        self.distance_count = 0
+        self.distance_sum = 0.0
+        self.distance_min = float("inf")
+        self.distance_max = float("-inf")
+        self.start_ts = None
+        self.end_ts = None
+
+    def add(self, motion, distance, ts):
+        if self.start_ts is None:
+            self.start_ts = ts
+        self.end_ts = ts
+        self.count += 1
+        self.motion_count += motion
+        if distance is not None:
+            self.distance_count += 1
+            self.distance_sum += distance
+            self.distance_min = min(self.distance_min, distance)
+            self.distance_max = max(self.distance_max, distance)
+        if self.include_samples:
+            self.samples.append([motion, None if distance is None else round(distance, 1)])
+
+        edge = self.last_motion is not None and motion != self.last_motion
+        self.last_motion = motion
+        if self.count >= self.size or (edge and self.flush_on_motion_edge):
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Summary of the buffered samples (None if empty), then start a new window"""
+        if not self.count:
+            return None
+        if self.distance_count:
+            mean = round(self.distance_sum / self.distance_count, 1)
+            low, high = round(self.distance_min, 1), round(self.distance_max, 1)
+        else:
+            mean = low = high = None
+        summary = {
+            "motion": 1 if self.motion_count else 0,
+            "distance": mean,
+            "distance_min": low,
+            "distance_mean": mean,
+            "distance_max": high,
+            "motion_fraction": round(self.motion_count / self.count, 3),
+            "samples": self.count,
+            "ts": self.start_ts,
+            "ts_end": self.end_ts
+        }
+        if self.include_samples:
+            summary["raw"] = self.samples
+        self._reset()
+        return summary
+
+
+class DeadbandFilter:
+    """Report-by-exception: publish only readings that changed enough.
+
+    A reading is sent when motion flips, when distance moved more than
+    `deadband` cm from the last sent value, or when `heartbeat` seconds
+    passed since the last send so subscribers can still tell the sensor is
+    alive. A distance appearing or going missing (None) counts as a change.
+    Everything else is suppressed; stats["sent"] includes heartbeats.
+    """
+
+    def __init__(self, deadband, heartbeat):
+        self.deadband = deadband
+        self.heartbeat = heartbeat
+        self.last_sent = None
+        self.last_sent_time = None
+        self.stats = {"sent": 0, "suppressed": 0, "heartbeats": 0}
+
+    def should_publish(self, reading, now):
+        last = self.last_sent
+        changed = last is None or reading["motion"] != last["motion"]
+        if not changed:
+            distance, last_distance = reading["distance"], last["distance"]
+            if distance is None or last_distance is None:
+                changed = distance is not last_distance
+            else:
+                changed = abs(distance - last_distance) > self.deadband
+        if not changed:
+            if now - self.last_sent_time < self.heartbeat:
+                self.stats["suppressed"] += 1
+                return False
+            self.stats["heartbeats"] += 1
+
+        self.stats["sent"] += 1
+        self.last_sent = reading
+        self.last_sent_time = now
+        return True
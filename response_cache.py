@@ -0,0 +1,69 @@
+import time
+from collections import OrderedDict
+
+# Keys that change on every call without changing the situation
+DROPPED_KEYS = frozenset(["timestamp", "ts"])
+DISTANCE_KEYS = frozenset(["distance", "distance_cm"])
+
+
+class ResponseCache:
+    """LRU + TTL cache for AI verdicts keyed on a quantized occupancy context.
+
+    Two contexts map to the same key when they only differ in timestamps or
+    in distance jitter inside one bucket. Each distance also keeps its
+    proximity flag (closer than proximity_threshold) so a bucket never
+    straddles the occupancy boundary unnoticed.
+    """
+
+    def __init__(self, maxsize=256, ttl=60, distance_bucket=10,
+                 proximity_threshold=50, time_bucket=5):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.distance_bucket = distance_bucket
+        self.proximity_threshold = proximity_threshold
+        self.time_bucket = time_bucket
+        self.entries = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def key_for(self, context):
+        """Canonical, hashable form of an occupancy context"""
+        return self._canonical(context)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        expires, value = entry
+        if time.monotonic() > expires:
+            del self.entries[key]
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def _canonical(self, value, key=None):
+        if isinstance(value, dict):
+            return tuple((k, self._canonical(v, k)) for k, v in sorted(value.items())
+                         if k not in DROPPED_KEYS)
+        if isinstance(value, (list, tuple)):
+            return tuple(self._canonical(v, key) for v in value)
+        if isinstance(value, float) and value == float("inf"):
+            return "inf"
+        if key in DISTANCE_KEYS and isinstance(value, (int, float)):
+            return (int(value // self.distance_bucket), value < self.proximity_threshold)
+        if key == "time_since_motion" and isinstance(value, (int, float)):
+            return int(value // self.time_bucket)
+        return value
@@ -0,0 +1,119 @@
+from array import array
+
+NO_MOTION_VALUE = -1  # stored when a sensor does not report motion
+NO_DISTANCE_VALUE = float("nan")  # stored when a sensor does not report distance
+
+
+class SensorHistory:
+    """Fixed-capacity ring buffer of one sensor's readings.
+
+    Readings are kept in preallocated array columns (ts, motion, distance),
+    so append is O(1) with no per-reading objects and memory stays flat at
+    about 17 bytes per slot. Readings come back as the usual dicts
+    ({"motion", "distance", "ts"}) only when asked for via latest()/last().
+
+    Presence counters over the newest `window` readings (motion count and
+    readings closer than close_threshold) are kept up to date on append, so
+    pattern checks never rescan the buffer.
+    """
+
+    __slots__ = ("capacity", "ts", "motion", "distance", "head", "count",
+                 "total", "motion_total", "distance_total", "distance_count",
+                 "last_motion_ts", "window", "close_threshold",
+                 "window_motion", "window_close")
+
+    def __init__(self, capacity, window=5, close_threshold=50):
+        self.capacity = capacity
+        self.window = min(window, capacity)
+        self.close_threshold = close_threshold
+        self.ts = array("d", bytes(8 * capacity))
+        self.motion = array("b", bytes(capacity))
+        self.distance = array("d", bytes(8 * capacity))
+        self.head = 0  # next slot to write
+        self.count = 0
+
+        # Aggregates over the buffered readings, updated on append
+        self.total = 0
+        self.motion_total = 0
+        self.distance_total = 0.0
+        self.distance_count = 0
+        self.last_motion_ts = 0
+
+        # Sliding-window presence counters over the newest `window` readings
+        self.window_motion = 0
+        self.window_close = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, ts, motion=None, distance=None):
+        i = self.head
+        if self.count >= self.window:
+            # Oldest reading of the window slides out (read before it can be overwritten)
+            self._leave_window((i - self.window) % self.capacity)
+        if self.count == self.capacity:
+            self._evict(i)
+        else:
+            self.count += 1
+
+        motion_value = NO_MOTION_VALUE if motion is None else int(motion)
+        distance_value = NO_DISTANCE_VALUE if distance is None else float(distance)
+        self.ts[i] = ts
+        self.motion[i] = motion_value
+        self.distance[i] = distance_value
+
+        self.total += 1
+        if motion_value == 1:
+            self.motion_total += 1
+            self.window_motion += 1
+            self.last_motion_ts = ts
+        if distance_value == distance_value:
+            self.distance_total += distance_value
+            self.distance_count += 1
+            if distance_value < self.close_threshold:
+                self.window_close += 1
+
+        self.head = (i + 1) % self.capacity
+
+    def _leave_window(self, i):
+        if self.motion[i] == 1:
+            self.window_motion -= 1
+        if self.distance[i] < self.close_threshold:
+            self.window_close -= 1
+
+    def _evict(self, i):
+        if self.motion[i] == 1:
+            self.motion_total -= 1
+        old_distance = self.distance[i]
+        if old_distance == old_distance:
+            self.distance_total -= old_distance
+            self.distance_count -= 1
+
+    def _slot(self, age):
+        """Buffer index of the reading `age` steps back (0 = newest)"""
+        return (self.head - 1 - age) % self.capacity
+
+    def record(self, age=0):
+        """Reading `age` steps back as a dict, omitting fields the sensor never reported"""
+        i = self._slot(age)
+        reading = {}
+        if self.motion[i] != NO_MOTION_VALUE:
+            reading["motion"] = self.motion[i]
+        distance = self.distance[i]
+        if distance == distance:
+            reading["distance"] = distance
+        reading["ts"] = self.ts[i]
+        return reading
+
+    def latest(self):
+        return self.record(0) if self.count else None
+
+    def last(self, n):
+        """The newest n readings as dicts, oldest first"""
+        n = min(n, self.count)
+        return [self.record(age) for age in range(n - 1, -1, -1)]
+
+    def mean_distance(self):
+        if not self.distance_count:
+            return None
+        return self.distance_total / self.distance_count
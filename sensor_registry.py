@@ -0,0 +1,189 @@
+"""Topic -> sensor key -> payload normalizer, shared by the dashboard and the analyzer.
+
+Each group publishes its own payload shape. A config entry lists, for every
+normalized field, the payload keys to try (first match wins), a cast and the
+default the analyzer uses when the key is missing. Sensors that the
+analyzer fuses into one vote (group2's PIR + ultrasonic) share a "combined"
+name. Adding a sensor is one more entry in SENSOR_CONFIG; topics may use
+MQTT wildcards (+ and #).
+
+Binary readings (see codec) carry normalized field names rather than the
+group's payload keys; from_binary() maps them onto the payload keys so the
+same extractors apply. Only sensors with a field the binary format carries
+get a "/bin" subscription.
+"""
+from codec import BINARY_FIELDS, READING_KEYS
+
+SENSOR_CONFIG = [
+    {
+        "topic": "/group1/sensors",
+        "key": "group1",
+        "fields": {
+            "motion": (("motion_detected",), int, 0),
+            "distance": (("distance_cm",), float, 999.0)
+        }
+    },
+    {
+        "topic": "group2/sensors/pir",
+        "key": "group2_pir",
+        "combined": "group2_combined",
+        "fields": {
+            "motion": (("motion_detected", "motion"), int, 0)
+        }
+    },
+    {
+        "topic": "group2/sensors/ultrasonic",
+        "key": "group2_ultrasonic",
+        "combined": "group2_combined",
+        "fields": {
+            "distance": (("distance_cm",), float, 999.0)
+        }
+    },
+    {
+        "topic": "group3/status",
+        "key": "group3",
+        "fields": {
+            "motion": (("motion",), int, 0),
+            "distance": (("distance",), float, 999.0)
+        }
+    },
+    {
+        "topic": "group3/command",
+        "key": "occupancy",
+        "kind": "status",
+        "fields": {
+            "occupancy": (("occupancy_state",), str, None),
+            "confidence": (("confidence",), str, None)
+        }
+    }
+]
+
+
+def _compile_extractor(fields, use_defaults):
+    """Build a payload -> normalized dict function for one sensor"""
+    items = tuple((name, keys, cast, default) for name, (keys, cast, default) in fields.items())
+
+    def extract(payload):
+        data = {}
+        for name, keys, cast, default in items:
+            for key in keys:
+                value = payload.get(key)
+                if value is not None:
+                    data[name] = cast(value)
+                    break
+            else:
+                data[name] = default if use_defaults else None
+        return data
+
+    return extract
+
+
+def topic_matches(pattern, topic):
+    """MQTT subscription matching with + (one level) and # (rest) wildcards"""
+    pattern_parts = pattern.split("/")
+    topic_parts = topic.split("/")
+    for i, part in enumerate(pattern_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts) or (part != "+" and part != topic_parts[i]):
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+
+class SensorSpec:
+    __slots__ = ("topic", "key", "kind", "combined", "fields", "extract", "extract_raw",
+                 "binary_keys", "typed")
+
+    def __init__(self, topic, key, fields, kind="sensor", combined=None):
+        self.topic = topic
+        self.key = key
+        self.kind = kind
+        self.combined = combined
+        self.fields = fields
+        # extract() fills defaults for the analyzer, extract_raw() leaves None for the dashboard
+        self.extract = _compile_extractor(fields, use_defaults=True)
+        self.extract_raw = _compile_extractor(fields, use_defaults=False)
+        # codec's typed SensorPayload keeps only READING_KEYS; other payloads decode as dicts
+        self.typed = kind == "sensor" and all(
+            key in READING_KEYS for keys, cast, default in fields.values() for key in keys)
+        # binary field name -> the first payload key the extractors look for
+        self.binary_keys = tuple((name, fields[name][0][0]) for name in BINARY_FIELDS
+                                 if name in fields) if kind == "sensor" else ()
+
+    @property
+    def binary(self):
+        """Whether this sensor can take a binary reading"""
+        return bool(self.binary_keys)
+
+    def from_binary(self, reading):
+        """Rename a decoded binary reading's fields to this sensor's payload keys"""
+        if not self.binary_keys:
+            raise ValueError(f"{self.topic}: no binary format")
+        payload = {key: value for key, value in reading.items() if key not in BINARY_FIELDS}
+        for name, key in self.binary_keys:
+            payload[key] = reading[name]
+        return payload
+
+
+class SensorRegistry:
+    """Dispatches topics to SensorSpecs with a single dict lookup.
+
+    Wildcard entries are matched once per new concrete topic and the result
+    is memoized, so steady-state dispatch is always one hash lookup.
+    """
+
+    def __init__(self, config=()):
+        self.specs = []
+        self.by_topic = {}
+        self.wildcards = []
+        for entry in config:
+            self.register(**entry)
+
+    def register(self, topic, key, fields, kind="sensor", combined=None):
+        spec = SensorSpec(topic, key, fields, kind, combined)
+        self.specs.append(spec)
+        if "+" in topic or "#" in topic:
+            self.wildcards.append(spec)
+            # Forget memoized misses that the new pattern might now match
+            self.by_topic = {t: s for t, s in self.by_topic.items() if s is not None}
+        else:
+            self.by_topic[topic] = spec
+        return spec
+
+    def lookup(self, topic):
+        try:
+            return self.by_topic[topic]
+        except KeyError:
+            pass
+        spec = None
+        for candidate in self.wildcards:
+            if topic_matches(candidate.topic, topic):
+                spec = candidate
+                break
+        self.by_topic[topic] = spec
+        return spec
+
+    def topics(self, kind=None):
+        """Subscription list, optionally limited to one kind ("sensor" or "status")"""
+        return [spec.topic for spec in self.specs if kind is None or spec.kind == kind]
+
+    def subscriptions(self, kind=None, binary_suffix="/bin"):
+        """topics() plus the binary-format variant of every sensor topic that can decode it"""
+        topics = []
+        for spec in self.specs:
+            if kind is not None and spec.kind != kind:
+                continue
+            topics.append(spec.topic)
+            if spec.binary and not spec.topic.endswith("#"):
+                topics.append(spec.topic + binary_suffix)
+        return topics
+
+    def keys(self, kind=None):
+        return [spec.key for spec in self.specs if kind is None or spec.kind == kind]
+
+    def individual_keys(self):
+        """Sensor keys that vote on their own (not part of a combined sensor)"""
+        return [spec.key for spec in self.specs if spec.kind == "sensor" and spec.combined is None]
+
+
+registry = SensorRegistry(SENSOR_CONFIG)
@@ -0,0 +1,249 @@
+"""Multiplexed driver and character set for the 4-digit 7-segment display.
+
+FONT holds precomputed 8-bit segment masks (digits, hex, the letters a
+7-segment digit can show, blank, minus); render() turns text like "Occ",
+"Err" or "12.5" into four masks. set_display()/show() turn those into
+per-digit frames once. A frame is
+an int whose bit n is the level of pin n (segments a-g and dp, then the four
+digit selects), with the active-low segment polarity already applied. A
+dedicated refresh thread writes one frame per digit slot on absolute
+deadlines, so every digit is lit for the same time (steady brightness) and
+the loop sleeps between slots instead of spinning.
+
+With lgpio available all twelve pins form one GPIO group and a frame is a
+single group_write() call; otherwise each pin is a gpiozero output device.
+Either way only pins whose level differs from the previous frame are
+written, and a blank display parks the refresh thread.
+"""
+import os
+import threading
+import time
+
+try:
+    import lgpio
+except ImportError:
+    lgpio = None
+
+SEGMENT_PINS = (26, 19, 13, 6, 5, 11, 9, 10)  # a, b, c, d, e, f, g, dp - active low
+DIGIT_PINS = (12, 16, 20, 21)  # digit select, left to right - active high
+GPIOCHIP = 0
+
+# bit 0 = segment a ... bit 6 = segment g, bit 7 = dp
+#
+#      a
+#    f   b
+#      g
+#    e   c
+#      d   dp
+FONT = {
+    "0": 0x3F, "1": 0x06, "2": 0x5B, "3": 0x4F, "4": 0x66,
+    "5": 0x6D, "6": 0x7D, "7": 0x07, "8": 0x7F, "9": 0x6F,
+    "A": 0x77, "b": 0x7C, "C": 0x39, "c": 0x58, "d": 0x5E, "E": 0x79, "F": 0x71,
+    "G": 0x3D, "H": 0x76, "h": 0x74, "I": 0x30, "i": 0x10, "J": 0x1E, "L": 0x38,
+    "n": 0x54, "O": 0x3F, "o": 0x5C, "P": 0x73, "r": 0x50, "S": 0x6D, "t": 0x78,
+    "U": 0x3E, "u": 0x1C, "y": 0x6E,
+    "-": 0x40, "_": 0x08, " ": 0x00
+}
+# letters with only one shape fall back to it in the other case ("e" -> "E", "B" -> "b")
+FONT.update({ch.swapcase(): mask for ch, mask in list(FONT.items()) if ch.swapcase() not in FONT})
+HEX_DIGITS = "0123456789AbCdEF"
+DP = 0x80
+
+SEGMENT_BITS = (1 << len(SEGMENT_PINS)) - 1
+DIGIT_BITS = ((1 << len(DIGIT_PINS)) - 1) << len(SEGMENT_PINS)
+BLANK = SEGMENT_BITS  # all segments high (off), no digit selected
+BLANK_FRAMES = (BLANK,) * len(DIGIT_PINS)
+
+
+def char_mask(value):
+    """Mask for one character, or an int 0-15 shown as a hex digit; unknown -> blank"""
+    if isinstance(value, int):
+        value = HEX_DIGITS[value] if 0 <= value < len(HEX_DIGITS) else None
+    return FONT.get(value, 0)
+
+
+def render(text, width=len(DIGIT_PINS)):
+    """Masks for `text`, right-aligned; a "." lights the dp of the character before it"""
+    masks = []
+    for ch in text:
+        if ch == "." and masks and not masks[-1] & DP:
+            masks[-1] |= DP
+        else:
+            masks.append(DP if ch == "." else char_mask(ch))
+    return [0] * (width - len(masks)) + masks[:width]
+
+
+def format_number(value, width=len(DIGIT_PINS), decimals=2):
+    """Text for `value` with as many decimals (up to `decimals`) as fit; "----" if it cannot fit"""
+    for places in range(decimals, -1, -1):
+        text = f"{value:.{places}f}"
+        if len(text.replace(".", "")) <= width:
+            return text
+    return "-" * width
+
+
+def frame_for(position, mask):
+    """Pin levels that light `mask` on digit `position`"""
+    return (~mask & SEGMENT_BITS) | (1 << (len(SEGMENT_PINS) + position))
+
+
+def _bits(word):
+    """Indexes of the set bits of word, lowest first"""
+    while word:
+        low = word & -word
+        yield low.bit_length() - 1
+        word ^= low
+
+
+class LgpioPins:
+    """All pins claimed as one lgpio group: one ioctl per changed frame"""
+
+    def __init__(self, pins, chip=GPIOCHIP):
+        self.pins = list(pins)
+        self.handle = lgpio.gpiochip_open(chip)
+        lgpio.group_claim_output(self.handle, self.pins, [(BLANK >> n) & 1 for n in range(len(self.pins))])
+        self.levels = BLANK
+        self.writes = 0
+
+    def write(self, levels):
+        if levels != self.levels:
+            lgpio.group_write(self.handle, self.pins[0], levels)
+            self.levels = levels
+            self.writes += 1
+
+    def close(self):
+        lgpio.group_free(self.handle, self.pins[0])
+        lgpio.gpiochip_close(self.handle)
+
+
+class GpiozeroPins:
+    """Fallback: one gpiozero output per pin; only pins that changed are written"""
+
+    def __init__(self, pins):
+        from gpiozero import DigitalOutputDevice
+        self.devices = [DigitalOutputDevice(pin, initial_value=bool(BLANK >> n & 1))
+                        for n, pin in enumerate(pins)]
+        self.levels = BLANK
+        self.writes = 0
+
+    def write(self, levels):
+        changed = levels ^ self.levels
+        if not changed:
+            return
+        self.levels = levels
+        devices = self.devices
+        # deselect first and select last, so the old digit never shows the new segments
+        for n in _bits(changed & DIGIT_BITS & ~levels):
+            devices[n].off()
+        for n in _bits(changed & SEGMENT_BITS):
+            devices[n].on() if levels >> n & 1 else devices[n].off()
+        for n in _bits(changed & DIGIT_BITS & levels):
+            devices[n].on()
+        self.writes += bin(changed).count("1")
+
+    def close(self):
+        for device in self.devices:
+            device.close()
+
+
+def open_pins(pins=SEGMENT_PINS + DIGIT_PINS):
+    return LgpioPins(pins) if lgpio is not None else GpiozeroPins(pins)
+
+
+def _try_realtime(priority=10):
+    """Ask for SCHED_FIFO on the calling thread; needs root or CAP_SYS_NICE"""
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        return True
+    except (AttributeError, OSError):
+        return False
+
+
+class MultiplexDisplay:
+    def __init__(self, pins=None, refresh_hz=100, realtime=True):
+        self.pins = pins or open_pins()
+        self.refresh_hz = refresh_hz
+        self.realtime = realtime
+        self.frames = BLANK_FRAMES
+        self.changed = threading.Event()
+        self.running = False
+        self.thread = None
+        self.stats = {"refreshes": 0, "late_slots": 0, "max_lateness": 0.0,
+                      "refresh_hz": 0.0, "realtime": False}
+
+    def set_masks(self, masks):
+        """Show raw segment masks (see FONT), leftmost digit first"""
+        frames = tuple(frame_for(position, mask) if mask else BLANK
+                       for position, mask in enumerate(masks[:len(DIGIT_PINS)]))
+        self.frames = frames + BLANK_FRAMES[len(frames):]  # one reference swap, never half a frame set
+        self.changed.set()
+
+    def set_display(self, values, dp_position=None):
+        """Show up to four values: ints 0-15 (as hex) or FONT characters; others are blank"""
+        masks = [char_mask(value) for value in values]
+        if dp_position is not None and dp_position < len(masks):
+            masks[dp_position] |= DP
+        self.set_masks(masks)
+
+    def show(self, text):
+        """Show text such as "Occ", "Err" or format_number(distance)"""
+        self.set_masks(render(text))
+
+    def clear(self):
+        self.set_masks(())
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="display-refresh", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.changed.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.pins.write(BLANK)
+
+    def close(self):
+        self.stop()
+        self.pins.close()
+
+    def _run(self):
+        if self.realtime:
+            self.stats["realtime"] = _try_realtime()
+        slot = 1.0 / (self.refresh_hz * len(DIGIT_PINS))
+        write = self.pins.write
+        deadline = window_start = time.perf_counter()
+        window_refreshes = 0
+        while self.running:
+            frames = self.frames
+            if frames == BLANK_FRAMES:
+                # nothing lit: park the thread until the next update instead of multiplexing blanks
+                write(BLANK)
+                self.changed.clear()
+                if self.frames == BLANK_FRAMES:
+                    self.changed.wait()
+                deadline = window_start = time.perf_counter()
+                window_refreshes = 0
+                continue
+            for frame in frames:
+                write(frame)
+                deadline += slot
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    self.stats["late_slots"] += 1
+                    self.stats["max_lateness"] = max(self.stats["max_lateness"], -delay)
+                    if delay < -slot:
+                        deadline = time.perf_counter()  # stalled; resync instead of bursting
+            self.stats["refreshes"] += 1
+            window_refreshes += 1
+            elapsed = time.perf_counter() - window_start
+            if elapsed >= 1.0:
+                self.stats["refresh_hz"] = window_refreshes / elapsed
+                window_start += elapsed
+                window_refreshes = 0
+        write(BLANK)
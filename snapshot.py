@@ -0,0 +1,39 @@
+import hashlib
+import threading
+
+import codec
+
+
+class Snapshot:
+    """Versioned, pre-serialized copy of the dashboard state.
+
+    The MQTT thread calls update(); it copies the dict, serializes it once
+    and swaps in a new (version, body, etag) tuple. Readers take `current`
+    with a single attribute read, so they never see a half-written dict and
+    never serialize anything themselves. The etag is a hash of the body, so
+    every web worker (and a restarted dashboard) agrees on it.
+    """
+
+    def __init__(self, initial):
+        self.lock = threading.Lock()
+        self.data = dict(initial)
+        self.current = self._freeze(0)
+
+    def _freeze(self, version):
+        body = codec.dumps(self.data)
+        return version, body, hashlib.blake2b(body, digest_size=8).hexdigest()
+
+    def update(self, key, value):
+        self.merge({key: value})
+
+    def merge(self, changes):
+        """Apply several key updates as one new version"""
+        with self.lock:
+            data = dict(self.data)
+            data.update(changes)
+            self.data = data
+            self.current = self._freeze(self.current[0] + 1)
+
+    @property
+    def version(self):
+        return self.current[0]
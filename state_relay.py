@@ -0,0 +1,84 @@
+"""Relay dashboard state from the single ingest process to the web workers.
+
+The ingest process runs a RelayServer on a local Unix socket. Every worker
+connects with a RelayClient and receives newline-delimited JSON objects:
+the full snapshot first, then one {sensor_key: reading} delta per MQTT
+message. Each object is merged into the worker's own Snapshot and pushed to
+its SSE clients, so N workers serve the same state as one ingest.
+"""
+import os
+import socket
+import socketserver
+import threading
+import time
+
+import codec
+
+
+class RelayServer:
+    def __init__(self, path, snapshot, broadcaster):
+        self.path = path
+        self.snapshot = snapshot
+        self.broadcaster = broadcaster
+        relay = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                relay._serve(self.request)
+
+        if os.path.exists(path):
+            os.unlink(path)
+        self.server = socketserver.ThreadingUnixStreamServer(path, Handler)
+        self.server.daemon_threads = True
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def _serve(self, sock):
+        events = self.broadcaster.subscribe()
+        try:
+            sock.sendall(self.snapshot.current[1] + b"\n")
+            while True:
+                event = events.get()
+                if event is None:
+                    return  # worker fell behind; it reconnects and resyncs from the snapshot
+                sock.sendall(event + b"\n")
+        except OSError:
+            pass
+        finally:
+            self.broadcaster.unsubscribe(events)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class RelayClient:
+    """Keeps a worker's snapshot in sync with the ingest process, reconnecting as needed"""
+
+    def __init__(self, path, on_update, retry_interval=1.0):
+        self.path = path
+        self.on_update = on_update
+        self.retry_interval = retry_interval
+        self.connected = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.connect(self.path)
+                    self.connected.set()
+                    with sock.makefile("rb") as stream:
+                        for line in stream:
+                            self.on_update(line.rstrip(b"\n"), codec.loads(line))
+            except (OSError, *codec.DecodeError) as e:
+                print(f"Ingest relay unavailable ({e}), retrying")
+            self.connected.clear()
+            time.sleep(self.retry_interval)
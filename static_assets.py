@@ -0,0 +1,98 @@
+"""Dashboard static assets: minified, content-hashed and precompressed once.
+
+AssetBundle.build() reads each source file under static/, minifies it,
+names it after a hash of its content (css/dashboard.css ->
+dashboard.<hash>.css) and keeps identity, gzip and (with the optional
+brotli package) br variants in memory. Because a new build gets a new URL,
+browsers may cache assets forever; only the small HTML page is revalidated.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from collections import namedtuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ASSET_MAX_AGE = 31536000  # one year, the usual "never expires"
+
+# Levels for dynamic responses; static assets use the maximum once at startup
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+Asset = namedtuple("Asset", ["name", "mimetype", "variants"])
+
+
+def minify_css(text):
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,])\s*", r"\1", text)
+    return text.replace(";}", "}").strip()
+
+
+def minify_js(text):
+    """Line-based and conservative: drop indentation, blank lines and whole-line comments.
+
+    Line breaks are kept, so automatic semicolon insertion behaves as before.
+    """
+    lines = (line.strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//")) + "\n"
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+def encodings():
+    """Content codings this process can produce, best first"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(body, encoding, best=False):
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if best else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=9 if best else GZIP_LEVEL, mtime=0)
+
+
+def choose_encoding(accept_encodings, available=None):
+    """Best coding the client accepts (werkzeug Accept object), or None for identity"""
+    for encoding in encodings():
+        if (available is None or encoding in available) and accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+class AssetBundle:
+    def __init__(self, root, names):
+        self.root = root
+        self.names = names
+        self.urls = {}
+        self.assets = {}
+
+    def build(self):
+        for name in self.names:
+            with open(os.path.join(self.root, name), "rb") as f:
+                body = f.read()
+            base, ext = os.path.splitext(os.path.basename(name))
+            if ext in MINIFIERS and not base.endswith(".min"):
+                body = MINIFIERS[ext](body.decode("utf-8")).encode("utf-8")
+            digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+            hashed = f"{base}.{digest}{ext}"
+            variants = {None: body}
+            for encoding in encodings():
+                compressed = compress(body, encoding, best=True)
+                if len(compressed) < len(body):
+                    variants[encoding] = compressed
+            mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            self.assets[hashed] = Asset(hashed, mimetype, variants)
+            self.urls[name] = "/assets/" + hashed
+        return self
+
+    def url(self, name):
+        return self.urls[name]
+
+    def get(self, hashed):
+        return self.assets.get(hashed)
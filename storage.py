@@ -0,0 +1,188 @@
+import math
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    sensor TEXT NOT NULL,
+    ts REAL NOT NULL,
+    motion INTEGER,
+    distance REAL
+);
+CREATE INDEX IF NOT EXISTS readings_sensor_ts ON readings (sensor, ts);
+"""
+
+# Rollup resolutions in seconds, finest first
+ROLLUPS = (1, 60, 3600)
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_{res} (
+    sensor TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    distance_min REAL,
+    distance_max REAL,
+    distance_sum REAL NOT NULL,
+    distance_count INTEGER NOT NULL,
+    motion_count INTEGER NOT NULL,
+    PRIMARY KEY (sensor, bucket)
+) WITHOUT ROWID;
+"""
+
+ROLLUP_UPSERT = """
+INSERT INTO rollup_{res} VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (sensor, bucket) DO UPDATE SET
+    count = count + excluded.count,
+    distance_min = min(coalesce(distance_min, excluded.distance_min),
+                       coalesce(excluded.distance_min, distance_min)),
+    distance_max = max(coalesce(distance_max, excluded.distance_max),
+                       coalesce(excluded.distance_max, distance_max)),
+    distance_sum = distance_sum + excluded.distance_sum,
+    distance_count = distance_count + excluded.distance_count,
+    motion_count = motion_count + excluded.motion_count
+"""
+
+
+def _rollup_rows(batch, res):
+    """Pre-aggregate a batch per (sensor, bucket) so each bucket is upserted once"""
+    buckets = {}
+    for sensor, ts, motion, distance in batch:
+        key = (sensor, int(ts // res) * res)
+        agg = buckets.get(key)
+        if agg is None:
+            agg = buckets[key] = [0, None, None, 0.0, 0, 0]
+        agg[0] += 1
+        if distance is not None:
+            agg[1] = distance if agg[1] is None else min(agg[1], distance)
+            agg[2] = distance if agg[2] is None else max(agg[2], distance)
+            agg[3] += distance
+            agg[4] += 1
+        if motion == 1:
+            agg[5] += 1
+    return [key + tuple(agg) for key, agg in buckets.items()]
+
+
+class ReadingStore:
+    """SQLite time-series store for sensor readings.
+
+    add() only enqueues, so the MQTT thread never touches the disk. A writer
+    thread drains the queue and commits everything gathered within
+    commit_interval seconds in one transaction (group commit). The database
+    runs in WAL mode, so query() from dashboard threads reads a consistent
+    snapshot without blocking the writer.
+
+    The same transaction updates 1 s / 1 min / 1 h rollups (min/max/mean
+    distance, motion count) that history() reads for long ranges.
+    """
+
+    def __init__(self, path, commit_interval=0.2, max_batch=2000, queue_size=50000):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.local = threading.local()
+        self.writer = None
+        self.stats = {"written": 0, "dropped": 0, "commits": 0}
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA + "".join(ROLLUP_SCHEMA.format(res=res) for res in ROLLUPS))
+        return conn
+
+    def start(self):
+        self._connect().close()  # create the schema before any reader shows up
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+        return self
+
+    def add(self, sensor, ts, motion=None, distance=None):
+        try:
+            self.queue.put_nowait((sensor, ts, motion, distance))
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def close(self, timeout=None):
+        if self.writer is not None:
+            self.queue.put(None)
+            self.writer.join(timeout)
+            self.writer = None
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            row = self.queue.get()
+            if row is None:
+                break
+            batch = [row]
+            deadline = time.monotonic() + self.commit_interval
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    row = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                batch.append(row)
+            self._commit(conn, batch)
+            if stop:
+                break
+        conn.close()
+
+    def _commit(self, conn, batch):
+        try:
+            with conn:
+                conn.executemany("INSERT INTO readings VALUES (?, ?, ?, ?)", batch)
+                for res in ROLLUPS:
+                    conn.executemany(ROLLUP_UPSERT.format(res=res), _rollup_rows(batch, res))
+            self.stats["written"] += len(batch)
+            self.stats["commits"] += 1
+        except sqlite3.Error as e:
+            self.stats["dropped"] += len(batch)
+            print(f"Storage write failed: {e}")
+
+    def _reader(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = self._connect()
+        return conn
+
+    def query(self, sensor, start, end, limit=10000):
+        """Readings of one sensor with start <= ts < end, oldest first"""
+        cursor = self._reader().execute(
+            "SELECT ts, motion, distance FROM readings "
+            "WHERE sensor = ? AND ts >= ? AND ts < ? ORDER BY ts LIMIT ?",
+            (sensor, start, end, limit))
+        return [{"ts": ts, "motion": motion, "distance": distance} for ts, motion, distance in cursor]
+
+    def history(self, sensor, start, end, step):
+        """Aggregated points of `step` seconds, read from the coarsest rollup finer than step"""
+        res = max([r for r in ROLLUPS if r <= step] or [ROLLUPS[0]])
+        # whole rollup buckets per point, or one straddling two points lands in just one
+        step = max(math.ceil(step / res), 1) * res
+        cursor = self._reader().execute(
+            f"SELECT CAST(bucket / ? AS INTEGER) * ? AS t, SUM(count), MIN(distance_min), "
+            f"MAX(distance_max), SUM(distance_sum), SUM(distance_count), SUM(motion_count) "
+            f"FROM rollup_{res} WHERE sensor = ? AND bucket >= ? AND bucket < ? "
+            f"GROUP BY t ORDER BY t",
+            (step, step, sensor, int(start // res) * res, end))
+        return {
+            "resolution": res,
+            "step": step,
+            "points": [{
+                "ts": t,
+                "count": count,
+                "distance_min": d_min,
+                "distance_max": d_max,
+                "distance_mean": d_sum / d_count if d_count else None,
+                "motion_count": motion_count
+            } for t, count, d_min, d_max, d_sum, d_count, motion_count in cursor]
+        }
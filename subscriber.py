@@ -1,157 +1,142 @@
 #!/usr/bin/env python3
 # encoding: utf-8
 
-import json
+import asyncio
 import time
 import threading
 import signal
 import sys
-import paho.mqtt.client as mqtt
 from gpiozero import LED
-
-# ------- Display Class --------
-
-class FourDigit7SegmentDisplay:
-    def __init__(self):
-        self.segments = {
-            'a': LED(26, active_high=False),
-            'b': LED(19, active_high=False),
-            'c': LED(13, active_high=False),
-            'd': LED(6, active_high=False),
-            'e': LED(5, active_high=False),
-            'f': LED(11, active_high=False),
-            'g': LED(9, active_high=False),
-            'dp': LED(10, active_high=False)
-        }
-
-        self.digits = [
-            LED(12),
-            LED(16),
-            LED(20),
-            LED(21)
-        ]
-
-        self.digit_codes = {
-            0: [1,1,1,1,1,1,0],
-            1: [0,1,1,0,0,0,0],
-            2: [1,1,0,1,1,0,1],
-            3: [1,1,1,1,0,0,1],
-            4: [0,1,1,0,0,1,1],
-            5: [1,0,1,1,0,1,1],
-            6: [1,0,1,1,1,1,1],
-            7: [1,1,1,0,0,0,0],
-            8: [1,1,1,1,1,1,1],
-            9: [1,1,1,1,0,1,1]
-        }
-
-        self.current_digits = [0, 0, 0, 0]
-        self.dp_position = None
-        self.clear()
-
-    def clear(self):
-        for segment in self.segments.values():
-            segment.off()
-        for digit in self.digits:
-            digit.off()
-
-    def set_display(self, values, dp_position=None):
-        self.current_digits = values
-        self.dp_position = dp_position
-
-    def refresh(self, refresh_delay=0.005):
-        for i in range(4):
-            self.set_digit(i, self.current_digits[i], show_dp=(i == self.dp_position))
-            time.sleep(refresh_delay)
-            self.clear()
-
-    def set_digit(self, digit_pos, number, show_dp=False):
-        if not 0 <= digit_pos < 4 or number not in self.digit_codes:
+from mqtt_ingest import IngestCore
+from seven_segment import MultiplexDisplay
+
+BROKER = "172.20.10.4"
+COMMAND_TOPIC = "group3/command"
+DISPLAY_REFRESH_HZ = 100  # full 4-digit refreshes per second
+
+# ------- Display State Machine --------
+
+class DisplayState:
+    """Event-driven display state: commands and one timeout drive the transitions.
+
+    update() runs on every command; a watchdog thread sleeps until the
+    stale deadline (or, once stale, until the next command) instead of
+    polling. A frame is (text, led); it is pushed to the driver only when
+    it differs from the one showing, so repeated identical commands cost
+    one tuple comparison.
+    """
+
+    def __init__(self, display, led, timeout):
+        self.display = display
+        self.led = led
+        self.timeout = timeout
+        self.cond = threading.Condition()
+        self.state = None
+        self.frame = None
+        self.deadline = time.monotonic() + timeout
+        self.stats = {"transitions": 0, "frames": 0, "unchanged_frames": 0, "timeouts": 0}
+
+    def start(self):
+        with self.cond:
+            self._enter("waiting", "0000", False)
+        threading.Thread(target=self._watchdog, name="display-timeout", daemon=True).start()
+        return self
+
+    def update(self, state, text, led_on):
+        """A valid command arrived: show it and push the stale deadline back"""
+        with self.cond:
+            self.deadline = time.monotonic() + self.timeout
+            was_stale = self.state == "stale"
+            self._enter(state, text, led_on)
+            if was_stale:
+                self.cond.notify()  # the watchdog waits without a deadline while stale
+
+    def error(self):
+        """A malformed command: flag it, but it does not count as a valid update"""
+        with self.cond:
+            self._enter("error", "Err", self.frame[1])
+
+    def _enter(self, state, text, led_on):
+        if state != self.state:
+            self.state = state
+            self.stats["transitions"] += 1
+        frame = (text, led_on)
+        if frame == self.frame:
+            self.stats["unchanged_frames"] += 1
             return
+        self.frame = frame
+        self.stats["frames"] += 1
+        self.display.show(text)
+        self.led.on() if led_on else self.led.off()
+
+    def _watchdog(self):
+        with self.cond:
+            while True:
+                if self.state == "stale":
+                    self.cond.wait()
+                    continue
+                remaining = self.deadline - time.monotonic()
+                if remaining > 0:
+                    self.cond.wait(remaining)  # a later update just moves the deadline
+                    continue
+                self.stats["timeouts"] += 1
+                self._enter("stale", "0000", False)  # Fallback
 
-        segment_list = ['a', 'b', 'c', 'd', 'e', 'f', 'g']
-        code = self.digit_codes[number]
-        for i, segment_name in enumerate(segment_list):
-            self.segments[segment_name].on() if code[i] else self.segments[segment_name].off()
-
-        self.segments['dp'].on() if show_dp else self.segments['dp'].off()
-        self.digits[digit_pos].on()
 
 # ------- Global Display & State --------
 
-display = FourDigit7SegmentDisplay()
+display = MultiplexDisplay(refresh_hz=DISPLAY_REFRESH_HZ)
 occupancy_led = LED(27)  # Change if 18 is already used
-last_valid_update = time.time()
-display_lock = threading.Lock()
 update_timeout = 60  # seconds
+display_state = DisplayState(display, occupancy_led, update_timeout)
 
+def start_display():
+    display.start()
+    display_state.start()
 
-# ------- Display Thread --------
-
-def display_loop():
-    while True:
-        with display_lock:
-            if time.time() - last_valid_update > update_timeout:
-                display.set_display([0, 0, 0, 0])  # Fallback
-                occupancy_led.off()
-        display.refresh()
+# ------- MQTT Handler --------
 
-display_thread = threading.Thread(target=display_loop, daemon=True)
-display_thread.start()
+async def handle_command(message):
+    """Coroutine handler for group3/command on the shared IngestCore (see mqtt_ingest)"""
+    print(f"[MQTT] Received: {message.payload}")
+    data = message.payload
 
-# ------- MQTT Handlers --------
-
-def on_connect(client, userdata, flags, rc, properties=None):
-    print(f"[MQTT] Connected with result code {rc}")
-    client.subscribe("group3/command")
-    print("[MQTT] Subscribed to topic: group3/command")
-
-def on_message(client, userdata, msg):
-    global last_valid_update
+    state = data.get("occupancy_state", "").lower()
+    confidence = data.get("confidence", "").lower()
     try:
-        payload = msg.payload.decode()
-        print(f"[MQTT] Received: {payload}")
-        data = json.loads(payload)
-
-        state = data.get("occupancy_state", "").lower()
-        confidence = data.get("confidence", "").lower()
         active_sensors_count = int(data.get("active_sensors_count", 0))
+    except (TypeError, ValueError):
+        print(f"[ERROR] Invalid active_sensors_count: {data.get('active_sensors_count')!r}")
+        display_state.error()
+        return
 
-        if state == "occupied" and confidence == "high":
-            occupancy_led.on()
-            digits = [int(d) for d in f"{active_sensors_count:0>4}"[-4:]]
-            with display_lock:
-                display.set_display(digits)
-        else:
-            occupancy_led.off()
-            with display_lock:
-                display.set_display([0, 0, 0, 0])
+    if state == "occupied" and confidence == "high":
+        display_state.update("occupied", f"Occ{min(active_sensors_count, 9)}", True)  # e.g. "Occ3"
+    else:
+        display_state.update("vacant", "0000", False)
 
-        last_valid_update = time.time()
-        # Update display with sensor count (always 4 digits)
-
-
-    except Exception as e:
-        print(f"[ERROR] Invalid message: {e}")
-
-# ------- MQTT Setup --------
-
-client = mqtt.Client()
-client.on_connect = on_connect
-client.on_message = on_message
-client.connect("172.20.10.4", 1883, 60)
+def register(core):
+    """Attach the display to an ingest core; only the newest command matters"""
+    core.subscribe("display", [COMMAND_TOPIC], handle_command, maxsize=1, policy="latest")
 
 # ------- Graceful Exit --------
 
 def handle_exit(sig, frame):
     print("\n[System] Shutting down...")
-    display.clear()
+    display.close()
     occupancy_led.off()
     sys.exit(0)
 
-signal.signal(signal.SIGINT, handle_exit)
-signal.signal(signal.SIGTERM, handle_exit)
-
 # ------- Start MQTT Loop --------
 
-print("[System] Display & MQTT Listener Running...")
-client.loop_forever()
\ No newline at end of file
+def main():
+    signal.signal(signal.SIGINT, handle_exit)
+    signal.signal(signal.SIGTERM, handle_exit)
+    start_display()
+    core = IngestCore(BROKER, 1883)
+    register(core)
+    print("[System] Display & MQTT Listener Running...")
+    asyncio.run(core.run())
+
+if __name__ == "__main__":
+    main()
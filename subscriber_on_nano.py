@@ -1,29 +1,42 @@
-import paho.mqtt.client as mqtt
-import json
+import asyncio
+import codec
 import time
-import requests
+import threading
+from analysis_worker import AnalysisWorker
+from mqtt_ingest import IngestCore
+from occupancy_engine import DecisionEngine, RulesClassifier
+from response_cache import ResponseCache
+from ollama_client import OllamaClient, compact_json
+from sensor_history import SensorHistory
+from sensor_registry import registry
 
 BROKER = "172.20.10.4"
-TOPICS = ["/group1/sensors", "group2/sensors/pir", "group2/sensors/ultrasonic", "group3/status"]
+TOPICS = registry.subscriptions("sensor")
+INDIVIDUAL_SENSORS = registry.individual_keys()  # group2 PIR + ultrasonic vote as one
 
 OLLAMA_URL = "http://localhost:11434/api/chat"
 MODEL_NAME = "qwen2.5:1.5b"
+OLLAMA_NUM_PREDICT = 8  # one word answer, stop generating early
+OLLAMA_KEEP_ALIVE = "30m"  # keep the model loaded between analyses
 
-# Store sensor history for each sensor
-sensor_history = {
-    "group1": [],
-    "group2_pir": [],
-    "group2_ultrasonic": [],
-    "group3": []
-}
 MAX_HISTORY = 10  # Keep last 10 readings per sensor
+PRESENCE_WINDOW = 5  # readings considered by detect_presence_pattern
 OCCUPANCY_DISTANCE_THRESHOLD = 50  # cm - within this range indicates presence
 MIN_SENSORS_FOR_OCCUPANCY = 2  # Minimum sensors that must agree for occupancy confirmation
 OCCUPANCY_TIMEOUT = 30  # seconds - no motion for this long = vacant
+DECISION_CONFIDENCE_THRESHOLD = 0.9  # below this the rules engine escalates to the AI
+AI_CACHE_TTL = 60  # seconds a cached AI verdict stays valid
+
+# Store sensor history for each sensor
+sensor_history = {
+    key: SensorHistory(MAX_HISTORY, PRESENCE_WINDOW, OCCUPANCY_DISTANCE_THRESHOLD)
+    for key in registry.keys("sensor")
+}
 
 # Aggregated data for multi-sensor analysis
 aggregated_data = {
     "latest_readings": {},
+    "last_motion_time": 0,  # newest motion reading across all sensors
     "last_analysis_time": 0,
     "analysis_interval": 3,  # seconds between analyses
     "current_occupancy_state": "vacant",  # vacant, occupied, unknown
@@ -31,40 +44,29 @@ aggregated_data = {
     "last_vacant_time": 0
 }
 
+# Guards sensor_history and aggregated_data["latest_readings"], which are
+# written on the MQTT thread and read by the analysis worker
+state_lock = threading.Lock()
+
+ollama_client = OllamaClient(OLLAMA_URL, MODEL_NAME, num_predict=OLLAMA_NUM_PREDICT,
+                             keep_alive=OLLAMA_KEEP_ALIVE)
+
 def call_ollama(messages):
-    try:
-        resp = requests.post(
-            OLLAMA_URL,
-            json={
-                "model": MODEL_NAME,
-                "messages": messages,
-                "stream": False
-            },
-            timeout=30,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        return data.get("message", {}).get("content", "")
-    except Exception as e:
-        print(f"Ollama call failed: {e}")
-        return None
+    return ollama_client.chat(messages)
 
-def detect_presence_pattern(sensor_history_list):
+def detect_presence_pattern(history):
     """Check for consistent presence patterns in sensor history"""
-    if len(sensor_history_list) < 3:
+    if len(history) < 3:
         return False, "insufficient_data"
     
-    recent_readings = sensor_history_list[-5:]  # Last 5 readings
-    motion_count = sum(1 for reading in recent_readings if reading.get("motion", 0) == 1)
-    
-    # Check for distances within occupancy range
-    close_distances = [reading["distance"] for reading in recent_readings 
-                      if "distance" in reading and reading["distance"] < OCCUPANCY_DISTANCE_THRESHOLD]
+    # Window counters are maintained by SensorHistory.append, once per reading
+    motion_count = history.window_motion
+    close_count = history.window_close
     
     # Presence indicators
     has_motion = motion_count > 0
-    has_close_proximity = len(close_distances) > 0
-    consistent_presence = motion_count >= 2 or len(close_distances) >= 3
+    has_close_proximity = close_count > 0
+    consistent_presence = motion_count >= 2 or close_count >= 3
     
     if has_motion and has_close_proximity:
         return True, "motion_and_proximity"
@@ -73,18 +75,6 @@ def detect_presence_pattern(sensor_history_list):
     else:
         return False, "no_presence_indicators"
 
-def get_sensor_key_from_topic(topic):
-    """Extract sensor key from topic"""
-    if topic == "/group1/sensors":
-        return "group1"
-    elif topic == "group2/sensors/pir":
-        return "group2_pir"
-    elif topic == "group2/sensors/ultrasonic":
-        return "group2_ultrasonic"
-    elif topic == "group3/status":
-        return "group3"
-    return None
-
 def analyze_group2_combined():
     """Analyze group2 PIR and ultrasonic sensors as a single combined sensor"""
     current_time = time.time()
@@ -94,12 +84,12 @@ def analyze_group2_combined():
     ultrasonic_latest = None
     
     if sensor_history["group2_pir"]:
-        pir_reading = sensor_history["group2_pir"][-1]
+        pir_reading = sensor_history["group2_pir"].latest()
         if current_time - pir_reading["ts"] <= 10:  # Recent data
             pir_latest = pir_reading
     
     if sensor_history["group2_ultrasonic"]:
-        ultrasonic_reading = sensor_history["group2_ultrasonic"][-1]
+        ultrasonic_reading = sensor_history["group2_ultrasonic"].latest()
         if current_time - ultrasonic_reading["ts"] <= 10:  # Recent data
             ultrasonic_latest = ultrasonic_reading
     
@@ -147,47 +137,28 @@ def analyze_group2_combined():
     else:
         return False, None
 
-def analyze_aggregated_data():
-    """Analyze data from all sensors for occupancy detection"""
-    current_time = time.time()
-    
-    # Check individual sensors (group1 and group3)
+def build_occupancy_context(current_time):
+    """Run sensor voting and build the context sent to the AI (caller holds state_lock)"""
+    # Check individual sensors (group1, group3, ...)
     active_sensors = []
     occupancy_sensors = []
     
-    # Check group1 sensor
-    if sensor_history["group1"]:
-        latest = sensor_history["group1"][-1]
-        if current_time - latest["ts"] <= 10:
-            active_sensors.append("group1")
-            
-            motion_detected = latest.get("motion", 0) == 1
-            distance = latest.get("distance", float('inf'))
-            presence_pattern, pattern_reason = detect_presence_pattern(sensor_history["group1"])
-            within_range = distance < OCCUPANCY_DISTANCE_THRESHOLD
-            
-            if motion_detected or (within_range and presence_pattern):
-                occupancy_sensors.append({
-                    "sensor": "group1",
-                    "motion": latest.get("motion", 0),
-                    "distance": latest.get("distance", "N/A"),
-                    "occupancy_reason": f"motion:{motion_detected}, range:{within_range}, pattern:{pattern_reason}"
-                })
-    
-    # Check group3 sensor
-    if sensor_history["group3"]:
-        latest = sensor_history["group3"][-1]
+    for sensor_key in INDIVIDUAL_SENSORS:
+        history = sensor_history[sensor_key]
+        if not history:
+            continue
+        latest = history.latest()
         if current_time - latest["ts"] <= 10:
-            active_sensors.append("group3")
+            active_sensors.append(sensor_key)
             
             motion_detected = latest.get("motion", 0) == 1
             distance = latest.get("distance", float('inf'))
-            presence_pattern, pattern_reason = detect_presence_pattern(sensor_history["group3"])
+            presence_pattern, pattern_reason = detect_presence_pattern(history)
             within_range = distance < OCCUPANCY_DISTANCE_THRESHOLD
             
             if motion_detected or (within_range and presence_pattern):
                 occupancy_sensors.append({
-                    "sensor": "group3",
+                    "sensor": sensor_key,
                     "motion": latest.get("motion", 0),
                     "distance": latest.get("distance", "N/A"),
                     "occupancy_reason": f"motion:{motion_detected}, range:{within_range}, pattern:{pattern_reason}"
@@ -207,12 +178,7 @@ def analyze_aggregated_data():
     occupancy_confirmed = len(occupancy_sensors) >= MIN_SENSORS_FOR_OCCUPANCY
     
     # Check for vacancy (no motion for OCCUPANCY_TIMEOUT seconds)
-    last_motion_time = 0
-    for readings in sensor_history.values():
-        for reading in reversed(readings):
-            if reading.get("motion", 0) == 1:
-                last_motion_time = max(last_motion_time, reading["ts"])
-                break
+    last_motion_time = aggregated_data["last_motion_time"]
     
     time_since_motion = current_time - last_motion_time if last_motion_time > 0 else float('inf')
     vacancy_timeout = time_since_motion > OCCUPANCY_TIMEOUT
@@ -242,10 +208,20 @@ def analyze_aggregated_data():
             "current_state": aggregated_data["current_occupancy_state"],
             "group2_treated_as_single": True
         },
-        "sensor_histories": {sensor: history[-3:] for sensor, history in sensor_history.items() if history},
-        "latest_readings": aggregated_data["latest_readings"],
+        "sensor_histories": {sensor: history.last(3) for sensor, history in sensor_history.items() if history},
+        "latest_readings": dict(aggregated_data["latest_readings"]),
         "timestamp": current_time
     }
+    return context
+
+def ask_ollama(context):
+    """Escalation path: let the AI decide ambiguous cases, returns (state, response_text)"""
+    # Near-identical situations reuse the previous verdict without an HTTP round trip
+    cache_key = response_cache.key_for(context)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        print(f"AI Occupancy Analysis (cached): {cached[1]}")
+        return cached
 
     system_prompt = (
         "You are an intelligent occupancy detection system analyzing multi-sensor data. "
@@ -262,7 +238,7 @@ def analyze_aggregated_data():
         "Focus on determining current room/space occupancy status."
     )
     
-    user_prompt = f"Analyze this occupancy data: {json.dumps(context, indent=2)}"
+    user_prompt = f"Analyze this occupancy data: {compact_json(context)}"
 
     response_text = call_ollama([
         {"role": "system", "content": system_prompt},
@@ -280,6 +256,31 @@ def analyze_aggregated_data():
         ai_state = "occupied"
     elif "VACANT" in response_text.upper():
         ai_state = "vacant"
+    response_cache.put(cache_key, (ai_state, response_text))
+    return ai_state, response_text
+
+response_cache = ResponseCache(ttl=AI_CACHE_TTL, proximity_threshold=OCCUPANCY_DISTANCE_THRESHOLD)
+decision_engine = DecisionEngine(RulesClassifier(), escalate=ask_ollama,
+                                 threshold=DECISION_CONFIDENCE_THRESHOLD)
+
+def analyze_aggregated_data():
+    """Analyze data from all sensors for occupancy detection"""
+    current_time = time.time()
+
+    # Snapshot the shared state quickly so ingestion is never blocked by the AI call
+    with state_lock:
+        context = build_occupancy_context(current_time)
+    active_sensors = context["occupancy_analysis"]["active_sensors"]
+    occupancy_sensors = context["occupancy_analysis"]["occupancy_sensors"]
+
+    decision = decision_engine.decide(context)
+    print(f"Decision stats: {decision_engine.stats}, AI cache stats: {response_cache.stats}")
+    if decision is None:
+        return None
+
+    ai_state = decision.state
+    response_text = decision.detail
+    print(f"Occupancy decision ({decision.source}, confidence {decision.confidence:.2f}): {ai_state}")
     
     # Update occupancy state if changed
     previous_state = aggregated_data["current_occupancy_state"]
@@ -300,15 +301,16 @@ def analyze_aggregated_data():
             "occupancy_sensors": occupancy_sensors,
             "active_sensors": active_sensors,
             "ai_analysis": response_text,
+            "decision_source": decision.source,
             "timestamp": current_time,
             "confidence": "high" if len(occupancy_sensors) >= MIN_SENSORS_FOR_OCCUPANCY else "low"
         }
         
         # Publish occupancy status
-        client.publish("group3/occupancy", json.dumps(occupancy_data))
+        ingest_core.publish("group3/occupancy", codec.dumps(occupancy_data))
         
         # Send command for occupancy-based actions
-        client.publish("group3/command", json.dumps({
+        ingest_core.publish("group3/command", codec.dumps({
             "occupancy_state": ai_state,
             "confidence": occupancy_data["confidence"],
             "active_sensors_count": len(active_sensors)
@@ -322,21 +324,16 @@ def analyze_aggregated_data():
 
 def process_sensor_data(sensor_key, data):
     """Process data from a specific sensor"""
-    # Add current reading to sensor history
-    sensor_history[sensor_key].append({
-        **data,
-        "ts": round(time.time(), 2)
-    })
-    
-    # Maintain history size
-    if len(sensor_history[sensor_key]) > MAX_HISTORY:
-        sensor_history[sensor_key].pop(0)
-    
-    # Update latest readings for aggregation
-    aggregated_data["latest_readings"][sensor_key] = {
-        **data,
-        "timestamp": time.time()
-    }
+    with state_lock:
+        now = time.time()
+        # Add current reading to sensor history (O(1), oldest reading is overwritten)
+        sensor_history[sensor_key].append(round(now, 2), data.get("motion"), data.get("distance"))
+        if data.get("motion") == 1:
+            aggregated_data["last_motion_time"] = sensor_history[sensor_key].last_motion_ts
+
+        # Update latest readings for aggregation; data is a fresh dict from on_message
+        data["timestamp"] = now
+        aggregated_data["latest_readings"][sensor_key] = data
     
     # Print sensor-specific info
     if sensor_key == "group2_pir":
@@ -344,75 +341,47 @@ def process_sensor_data(sensor_key, data):
     else:
         print(f"{sensor_key}: motion={data.get('motion', 0)}, distance={data.get('distance', 'N/A')}cm")
 
-def on_connect(client, userdata, flags, rc):
-    print(f"Connected with result code {rc}")
-    for topic in TOPICS:
-        client.subscribe(topic)
-        print(f"Subscribed to {topic}")
+async def handle_message(message):
+    """Coroutine handler for sensor readings from the shared IngestCore (see mqtt_ingest)"""
+    spec = message.spec
+    if spec is None or spec.kind != "sensor":
+        return
+    if message.replayed:
+        return  # a late reading from a publisher's outbox says nothing about the room now
 
-def on_message(client, userdata, msg):
-    try:
-        topic = msg.topic
-        sensor_key = get_sensor_key_from_topic(topic)
-        
-        if sensor_key is None:
-            return
-            
-        payload = json.loads(msg.payload.decode())
-        print(f"Received from {topic}: {payload}")
-        
-        # Extract data based on sensor type
-        if sensor_key == "group2_pir":
-            # PIR sensor only has motion
-            data = {
-                "motion": int(payload.get("motion", 0))
-            }
-        elif sensor_key == "group1":
-            # Group1 sensor uses distance_cm key
-            data = {
-                "motion": int(payload.get("motion_detected", 0)),
-                "distance": float(payload.get("distance_cm", 999.0))
-            }
-        elif sensor_key == "group2_ultrasonic":
-            # Ultrasonic sensor uses distance key
-            data = {
-                "distance": float(payload.get("distance_cm", 999.0))
-            }
-        else:
-            # Other sensors use distance key
-            data = {
-                "distance": float(payload.get("distance", 999.0)),
-                "motion": int(payload.get("motion", 0))
-            }
-
-        # Process data for this specific sensor
-        process_sensor_data(sensor_key, data)
-        
-        current_time = time.time()
-        
-        # Perform occupancy analysis at intervals or when motion is detected
-        if (data.get("motion", 0) == 1 or 
-            current_time - aggregated_data["last_analysis_time"] > aggregated_data["analysis_interval"]):
-            
-            aggregated_data["last_analysis_time"] = current_time
-            result = analyze_aggregated_data()
-            
-            if result:
-                print(f"Occupancy Analysis Result: {result}")
-            
-    except json.JSONDecodeError:
-        print(f"Failed to decode JSON from {msg.topic}")
-    except Exception as e:
-        print(f"Error processing message from {msg.topic}: {e}")
+    print(f"Received from {message.topic}: {message.payload}")
+
+    # Normalize the group-specific payload keys (see sensor_registry)
+    sensor_key = spec.key
+    data = spec.extract(message.payload)
+
+    # Process data for this specific sensor
+    process_sensor_data(sensor_key, data)
+
+    current_time = message.received
+
+    # Perform occupancy analysis at intervals or when motion is detected
+    if (data.get("motion", 0) == 1 or
+        current_time - aggregated_data["last_analysis_time"] > aggregated_data["analysis_interval"]):
+
+        aggregated_data["last_analysis_time"] = current_time
+        # Hand off to the worker so the event loop keeps delivering messages
+        analysis_worker.submit(current_time)
 
-def on_subscribe(client, userdata, mid, granted_qos):
-    print(f"Subscribed with mid: {mid}, QoS: {granted_qos}")
+analysis_worker = AnalysisWorker(analyze_aggregated_data)
+ingest_core = None  # set by register(); verdicts are published on its connection
 
-client = mqtt.Client()
-client.on_connect = on_connect
-client.on_message = on_message
-client.on_subscribe = on_subscribe
+def register(core):
+    """Attach the analyzer to an ingest core; history needs every reading, so it blocks"""
+    global ingest_core
+    ingest_core = core
+    core.subscribe("occupancy", TOPICS, handle_message, maxsize=1000, policy="block")
 
+def main():
+    analysis_worker.start()
+    core = IngestCore(BROKER, 1883)
+    register(core)
+    asyncio.run(core.run())
 
-client.connect(BROKER, 1883, 60)
-client.loop_forever()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+from collections import namedtuple
+
+import pytest
+
+import codec
+import mqtt_ingest
+from sensor_registry import SENSOR_CONFIG, SensorRegistry
+
+MqttMessage = namedtuple("MqttMessage", ["topic", "payload", "properties"])
+
+# a group added by config alone, with payload keys the typed struct doesn't know
+GROUP4 = {
+    "topic": "group4/sensors",
+    "key": "group4",
+    "fields": {
+        "motion": (("pir",), int, 0),
+        "distance": (("range_cm",), float, 999.0)
+    }
+}
+
+SAMPLE_VALUES = {int: 1, float: 12.5, str: "OCCUPIED"}
+
+
+def sample_payload(spec):
+    """One payload in the group's own shape, and the reading it should extract to"""
+    payload, expected = {}, {}
+    for name, (keys, cast, default) in spec.fields.items():
+        payload[keys[0]] = expected[name] = SAMPLE_VALUES[cast]
+    return payload, expected
+
+
+@pytest.fixture(params=["typed", "stdlib"])
+def registry(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(codec, "decode_reading", codec._stdlib_loads)
+        monkeypatch.setattr(codec, "loads", codec._stdlib_loads)
+    registry = SensorRegistry(SENSOR_CONFIG + [GROUP4])
+    monkeypatch.setattr(mqtt_ingest, "registry", registry)
+    return registry
+
+
+def test_every_registered_payload_decodes(registry):
+    for spec in registry.specs:
+        payload, expected = sample_payload(spec)
+        message = mqtt_ingest.IngestCore._decode(MqttMessage(spec.topic, codec.dumps(payload), None))
+        assert message.spec is spec
+        assert spec.extract(message.payload) == expected, spec.topic
+        assert spec.extract_raw(message.payload) == expected, spec.topic
+
+
+def test_numbers_sent_as_strings_decode(registry):
+    spec = registry.lookup("/group1/sensors")
+    msg = MqttMessage(spec.topic, b'{"motion_detected": "1", "distance_cm": "42.1"}', None)
+    reading = spec.extract(mqtt_ingest.IngestCore._decode(msg).payload)
+    assert reading == {"motion": 1, "distance": 42.1}
@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+
+os.environ.setdefault("GPIOZERO_PIN_FACTORY", "mock")  # distance_sensor opens its pins on import
+
+import pytest
+from gpiozero import Device, MotionSensor
+from gpiozero.pins.mock import MockFactory
+
+from distance_sensor import SensorSampler, build_filter_pipeline
+
+PIR_PIN = 5
+
+
+class FakeUltrasonic:
+    """Stands in for DistanceSensor; .distance blocks once `echo` is cleared, like no echo"""
+
+    def __init__(self, metres=0.425):
+        self.metres = metres
+        self.closed = False
+        self.echo = threading.Event()
+        self.echo.set()
+
+    @property
+    def distance(self):
+        self.echo.wait()
+        return self.metres
+
+    def close(self):
+        self.closed = True
+        self.echo.set()
+
+
+@pytest.fixture
+def devices():
+    assert isinstance(Device.pin_factory, MockFactory)
+    pir = MotionSensor(PIR_PIN)
+    ultrasonic = FakeUltrasonic()
+    yield pir, ultrasonic
+    ultrasonic.close()
+    pir.close()
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_short_pir_pulse_between_reads_is_latched(devices):
+    pir, ultrasonic = devices
+    sampler = SensorSampler(pir, ultrasonic, distance_interval=0.01)
+    assert sampler.read()[0] == 0
+    pir.pin.drive_high()
+    wait_for(lambda: sampler.motion_events == 1)
+    pir.pin.drive_low()
+    wait_for(lambda: sampler.motion == 0)
+    assert sampler.read()[0] == 1  # the pulse ended before this read, but was seen
+    assert sampler.read()[0] == 0  # and is reported only once
+
+
+def test_read_returns_cached_distance_without_blocking(devices):
+    pir, ultrasonic = devices
+    sampler = SensorSampler(pir, ultrasonic, distance_interval=0.01)
+    wait_for(lambda: sampler.distance is not None)
+    ultrasonic.echo.clear()  # the sensor now blocks, as with no echo
+    time.sleep(0.05)
+    start = time.monotonic()
+    motion, distance, distance_ts = sampler.read()
+    assert time.monotonic() - start < 0.05
+    assert distance == pytest.approx(42.5)
+    assert distance_ts <= time.time() - 0.05  # the cached value shows its age
+
+
+def test_read_gives_up_when_every_sample_is_rejected(devices):
+    pir, ultrasonic = devices
+    ultrasonic.metres = 9.0  # beyond RangeFilter's 4 m
+    sampler = SensorSampler(pir, ultrasonic, distance_interval=0.01,
+                            distance_filter=build_filter_pipeline())
+    start = time.monotonic()
+    assert sampler.read(timeout=0.1) == [0, None, None]
+    assert time.monotonic() - start < 1.0
+    start = time.monotonic()
+    assert sampler.read(timeout=0.1) == [0, None, None]  # only the first read waits
+    assert time.monotonic() - start < 0.05
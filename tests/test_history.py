@@ -0,0 +1,44 @@
+import pytest
+
+import app as dashboard_app
+from storage import ReadingStore
+
+DAY = 86400
+START = 1_700_000_000 - 1_700_000_000 % DAY
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    store = ReadingStore(str(tmp_path_factory.mktemp("history") / "readings.db")).start()
+    for ts in range(START, START + DAY, 3):  # a constant 3-second stream
+        store.add("group1", ts, 1, 50.0)
+    store.close()
+    return store
+
+
+def test_points_cover_whole_rollup_buckets(store):
+    history = store.history("group1", START, START + DAY, DAY / 300)
+    assert history["resolution"] == 60
+    assert history["step"] % history["resolution"] == 0
+    counts = {point["count"] for point in history["points"]}
+    motion = {point["motion_count"] for point in history["points"]}
+    assert counts == motion == {history["step"] // 3}
+
+
+@pytest.fixture(scope="module")
+def client(store):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(dashboard_app, "store", store)
+        yield dashboard_app.create_app().test_client()
+
+
+@pytest.mark.parametrize("query", ["to=nan", "from=nan", "to=inf", "from=-inf", "step=nan", "step=inf"])
+def test_history_rejects_non_finite_parameters(client, query):
+    response = client.get(f"/history?sensor=group1&{query}")
+    assert response.status_code == 400
+
+
+def test_history_is_bounded(client):
+    response = client.get(f"/history?sensor=group1&from={START}&to={START + DAY}&step=1")
+    points = response.get_json()["points"]
+    assert 0 < len(points) <= dashboard_app.HISTORY_MAX_POINTS
@@ -0,0 +1,99 @@
+import os
+
+import pytest
+
+from offline_queue import RECORD_HEADER, OfflineQueue
+
+TOPIC = "group3/status"
+
+
+def payload(n):
+    return b'{"n":%03d}' % n
+
+
+RECORD_SIZE = RECORD_HEADER.size + len(TOPIC) + len(payload(0))
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "outbox.log")
+
+
+def fill(queue, numbers):
+    for n in numbers:
+        queue.append(TOPIC, payload(n), float(n))
+
+
+def queued(queue):
+    return [p for ts, topic, p in queue.peek(len(queue))[1]]
+
+
+def test_peek_leaves_records_until_commit(path):
+    queue = OfflineQueue(path)
+    fill(queue, range(5))
+    seq, records = queue.peek(3)
+    assert records == [(float(n), TOPIC, payload(n)) for n in range(3)]
+    assert len(queue) == 5
+    assert queue.commit(seq + len(records)) == 3
+    assert queued(queue) == [payload(3), payload(4)]
+
+
+def test_commit_skips_records_dropped_meanwhile(path):
+    queue = OfflineQueue(path, max_bytes=5 * RECORD_SIZE)
+    fill(queue, range(5))
+    seq, records = queue.peek(3)  # 0-2 are being delivered...
+    fill(queue, range(5, 7))  # ...while appends drop 0 and 1
+    assert queue.commit(seq + len(records)) == 1  # only 2 was still queued
+    assert queued(queue) == [payload(n) for n in range(3, 7)]
+
+
+def test_reopen_after_crash_keeps_commits(path):
+    queue = OfflineQueue(path)
+    fill(queue, range(5))
+    seq, records = queue.peek(2)
+    queue.commit(seq + len(records))
+    # no close(): as after a power cut
+    assert queued(OfflineQueue(path)) == [payload(n) for n in range(2, 5)]
+
+
+def test_reopen_after_crash_keeps_drops(path):
+    queue = OfflineQueue(path, max_bytes=95 * RECORD_SIZE)
+    fill(queue, range(110))
+    assert queue.stats["dropped"] == 15
+    reopened = OfflineQueue(path, max_bytes=95 * RECORD_SIZE)
+    assert queued(reopened) == [payload(n) for n in range(15, 110)]
+
+
+def test_compaction_rewrites_the_unread_tail(path):
+    queue = OfflineQueue(path, compact_bytes=4 * RECORD_SIZE)
+    fill(queue, range(6))
+    seq, records = queue.peek(4)
+    queue.commit(seq + len(records))
+    assert queue.stats["compactions"] == 1
+    assert os.path.getsize(path) == 2 * RECORD_SIZE
+    fill(queue, [6])
+    assert queued(OfflineQueue(path)) == [payload(n) for n in (4, 5, 6)]
+
+
+def test_torn_record_is_truncated_on_open(path):
+    queue = OfflineQueue(path)
+    fill(queue, range(3))
+    queue.close()
+    with open(path, "ab") as f:
+        f.write(RECORD_HEADER.pack(3.0, len(TOPIC), 100) + TOPIC.encode())  # cut mid-write
+    reopened = OfflineQueue(path)
+    assert queued(reopened) == [payload(n) for n in range(3)]
+    assert os.path.getsize(path) == 3 * RECORD_SIZE
+
+
+def test_head_of_another_file_is_ignored(path):
+    queue = OfflineQueue(path)
+    fill(queue, range(3))
+    seq, records = queue.peek(2)
+    queue.commit(seq + len(records))
+    queue.close()
+    with open(path + ".head") as f:
+        offset, inode = f.read().split()
+    with open(path + ".head", "w") as f:  # e.g. saved before a compaction replaced the log
+        f.write(f"{offset} {int(inode) + 1}\n")
+    assert queued(OfflineQueue(path)) == [payload(n) for n in range(3)]
@@ -0,0 +1,63 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ollama_client import OllamaClient
+
+REPLY = ["The room is ", "OCCUPIED", ".", " Motion", " and", " distance", " agree."]
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    """Streams REPLY as chunked NDJSON, one token per chunk, like /api/chat"""
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in REPLY:
+            self._chunk({"message": {"role": "assistant", "content": token}, "done": False})
+        self._chunk({"message": {"role": "assistant", "content": ""}, "done": True})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _chunk(self, obj):
+        data = json.dumps(obj).encode() + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    server.daemon_threads = True
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_reply_is_cut_at_stop_word(server):
+    client = OllamaClient(f"http://127.0.0.1:{server.server_port}/api/chat", "test")
+    assert client.chat([{"role": "user", "content": "?"}]) == "The room is OCCUPIED"
+    client.close()
+
+
+def test_connection_is_reused_after_stop_word(server):
+    client = OllamaClient(f"http://127.0.0.1:{server.server_port}/api/chat", "test")
+    for _ in range(5):
+        assert client.chat([{"role": "user", "content": "?"}]) == "The room is OCCUPIED"
+    client.close()
+    assert server.connections == 1
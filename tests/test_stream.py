@@ -0,0 +1,36 @@
+import threading
+
+import pytest
+
+import app as dashboard_app
+
+
+@pytest.fixture(scope="module")
+def client():
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(dashboard_app, "stream_slots", threading.BoundedSemaphore(2))
+        yield dashboard_app.create_app().test_client()
+
+
+def open_stream(client):
+    response = client.get("/stream", buffered=False)
+    assert next(iter(response.response)).startswith(b"event: snapshot")
+    return response
+
+
+def test_streams_past_the_cap_are_refused(client):
+    streams = [open_stream(client), open_stream(client)]
+    refused = client.get("/stream")
+    assert refused.status_code == 503
+    assert refused.headers["Retry-After"]
+    streams.pop().close()
+    streams.append(open_stream(client))  # the freed slot is reusable
+    for response in streams:
+        response.close()
+
+
+def test_client_gone_before_streaming_leaves_nothing_behind(client):
+    client.get("/stream", buffered=False).close()  # the generator never ran
+    assert not dashboard_app.broadcaster.clients
+    assert dashboard_app.stream_slots.acquire(blocking=False)
+    dashboard_app.stream_slots.release()
@@ -0,0 +1,6 @@
+# WSGI entry point for multi-worker serving: gunicorn -c gunicorn.conf.py wsgi:app
+# Workers only serve HTTP; MQTT ingest runs once, in the process started by
+# gunicorn.conf.py, and reaches every worker through the state relay socket.
+from app import create_app, RELAY_SOCKET
+
+app = create_app(relay_path=RELAY_SOCKET)